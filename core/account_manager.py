@@ -4,21 +4,24 @@ import random
 from datetime import datetime
 from pathlib import Path
 
-from sqlalchemy.orm import joinedload
-
+from core.address_derivation import CHAINS, preset_chains
 from core.db_utils.db import db
-from core.db_utils.models import Account, RouteAction, RouteStatus, Route
+from core.db_utils.models import RouteStatus
+from core.db_utils.records import AccountRecord
+from core.db_utils.proxy_pool import proxy_pool
+from core.db_utils.status_buffer import status_buffer
 from core.excel import ExcelManager
 from core.notificator import Notificator
+from core.preset_params import preset_params_cache, validate_preset
 from utils.utils import read_toml, randfloat, excname
 from core.logger import get_logger, LogContext
 from core.init_settings import settings
-from tasks.executioner import Executioner
+from tasks.executioner import Executioner, TransfersInFlight
 
 
 class AccountManager:
     def __init__(self):
-        self.accounts: dict[int, Account] = {}
+        self.accounts: dict[int, AccountRecord] = {}
         self.spare_proxies = []
         self.flows = []
         self.flows_remaining = len(self.flows)
@@ -27,23 +30,31 @@ class AccountManager:
         self.completed_accounts = 0
         self.completed_accounts_lock = asyncio.Lock()  # Блокировка для счетчика
         self.processed_account_ids = set()  # Множество для отслеживания обработанных аккаунтов
+        # аккаунты, ждущие доставки кроссчейн переводов вне своего flow
+        self.in_flight: set[asyncio.Task] = set()
         self.logger = get_logger(class_name=self.__class__.__name__)
         self.tg_notificator = Notificator(LogContext.get())
 
-    def load_accounts_from_excel(self):
+    async def load_accounts_from_excel(self, chains: tuple[str, ...] = CHAINS):
         columns = dataclasses.asdict(settings.private)
         excel_manager = ExcelManager()
 
-        accounts, spare_proxies = excel_manager.load_accounts(**columns)
-        db.add_accounts(accounts, spare_proxies)
+        # чтение таблицы и вычисление адресов (пул процессов) не блокируют event loop
+        rows, spare_proxies = await asyncio.to_thread(excel_manager.load_rows, **columns)
+        # в базе обновляются только новые и измененные строки таблицы
+        await db.run(db.sync_accounts, rows, spare_proxies, chains)
+        proxy_pool.invalidate()
 
     async def generate_new_routes_for_preset(self, preset: dict[str, Path | str]):
         preset_data = read_toml(preset["path"])
-        db.delete_all_routes()
+        # плохой пресет должен упасть до удаления старых маршрутов
+        validate_preset(preset_data)
 
-        self.load_accounts_from_excel()
+        # адреса сетей, которые пресет не использует, не вычисляются
+        await self.load_accounts_from_excel(preset_chains(preset_data))
 
-        db.generate_routes_for_accounts(preset_data)
+        # маршруты пересоздаются только для новых аккаунтов, другого пресета или уже начатые
+        await db.run(db.generate_routes_for_accounts, preset_data)
 
 
     def create_flows(self):
@@ -64,7 +75,7 @@ class AccountManager:
         return self.flows
 
 
-    async def process_account(self, account: Account, start_sleep: float, account_num: int, rerun_failed: bool):
+    async def process_account(self, account: AccountRecord, start_sleep: float, account_num: int, rerun_failed: bool):
         total_actions = len(list(account.route.actions))
         await asyncio.sleep(start_sleep)
 
@@ -81,23 +92,10 @@ class AccountManager:
         account_logger = get_logger(class_name=self.__class__.__name__, **base_log_context)
         previous_status = account.route.status
 
-        session = db.Session()
-        try:
-            # Загружаем все необходимые связи заранее
-            account = session.merge(account)  # Привязываем аккаунт к текущей сессии
-
-            # Загружаем все необходимые связи
-            account = session.query(Account).options(
-                joinedload(Account.route).joinedload(Route.actions).joinedload(RouteAction.params)
-            ).filter(Account.id == account.id).first()
-        finally:
-            session.close()
-
         action = None
         actions_dict = {}
         try:
-            await db.update_obj_column(account.route, "status", RouteStatus.IN_PROGRESS)
-            await db.update_obj_column(account.route, "started_at", datetime.now())
+            await status_buffer.update(account.route, status=RouteStatus.IN_PROGRESS, started_at=datetime.now())
 
             for action_num, action in enumerate(list(account.route.actions), start=1):
                 action_log_context = {
@@ -118,22 +116,26 @@ class AccountManager:
                         account_logger.warning(f"Skipping {action.action_name} with status {action.status}")
                         continue
 
-                await db.update_obj_column(action, "status", RouteStatus.IN_PROGRESS)
-                await db.update_obj_column(action, "started_at", datetime.now())
+                await status_buffer.update(action, status=RouteStatus.IN_PROGRESS, started_at=datetime.now())
                 try:
                     executioner = Executioner(account=account, total_account_num=account_num,
                                               action_num=action_num, total_actions=total_actions)
                     result = await executioner.execute_action(action=action)
 
+                    if isinstance(result, TransfersInFlight):
+                        # аккаунт освобождает слот во flow, действие завершится после доставки переводов
+                        self.track_in_flight(account, action, action_num, result, actions_dict, account_logger,
+                                             base_log_context)
+                        return
+
                     if result is True or isinstance(result, dict):
                         actions_dict[action.action_name].append(True)
-                        await db.update_obj_column(action, "status", RouteStatus.COMPLETED)
+                        await status_buffer.update(action, status=RouteStatus.COMPLETED, completed_at=datetime.now())
                     else:
                         actions_dict[action.action_name].append(False)
-                        await db.update_obj_column(action, "status", RouteStatus.FAILED)
+                        await status_buffer.update(action, status=RouteStatus.FAILED, completed_at=datetime.now())
 
                     # actions_dict[action.action_name]["count"] += 1
-                    await db.update_obj_column(action, "completed_at", datetime.now())
                     if action_num < len(list(account.route.actions)):
                         delay = random.randint(settings.delays.action_delay[0], settings.delays.action_delay[1])
                         account_logger.info(f"Sleeping for 💤{delay}💤 seconds before next action")
@@ -152,24 +154,13 @@ class AccountManager:
 
                     actions_dict[action.action_name].append(False)
                     # actions_dict[action.action_name]["count"] += 1
-                    await db.update_obj_column(action, "status", RouteStatus.FAILED)
-                    await db.update_obj_column(action, "completed_at", datetime.now())
+                    await status_buffer.update(action, status=RouteStatus.FAILED, completed_at=datetime.now())
                     if isinstance(e, RuntimeError):
                         raise e
 
                     return
 
-            account_logger.info(f"Account {account.name} finished, waiting for other accounts in flow")
-
-            previous_status = account.route.status
-            if False in list(actions_dict.values()):
-                await db.update_obj_column(account.route, "status", RouteStatus.FAILED)
-
-            else:
-                await db.update_obj_column(account.route, "status", RouteStatus.COMPLETED)
-
-            await db.update_obj_column(account.route, "completed_at", datetime.now())
-            await self.finalize_account_processing(account, actions_dict, previous_status, account_logger, base_log_context)
+            await self.complete_route(account, actions_dict, account_logger, base_log_context)
 
         except Exception as e:
             if settings.logging.debug_logging:
@@ -177,8 +168,7 @@ class AccountManager:
             else:
                 self.logger.error(f"{excname(e)} Error processing account: {str(e)}")
             if account.route:
-                await db.update_obj_column(account.route, "status", RouteStatus.FAILED)
-                await db.update_obj_column(account.route, "completed_at", datetime.now())
+                await status_buffer.update(account.route, status=RouteStatus.FAILED, completed_at=datetime.now())
 
             if action:
                 actions_dict[action.action_name].append(False)
@@ -187,6 +177,64 @@ class AccountManager:
             await self.finalize_account_processing(account, actions_dict, previous_status, account_logger, base_log_context)
 
 
+    async def complete_route(self, account: AccountRecord, actions_dict: dict[str, list], account_logger,
+                             base_log_context: dict):
+        account_logger.info(f"Account {account.name} finished, waiting for other accounts in flow")
+
+        previous_status = account.route.status
+        if False in list(actions_dict.values()):
+            route_status = RouteStatus.FAILED
+
+        else:
+            route_status = RouteStatus.COMPLETED
+
+        await status_buffer.update(account.route, status=route_status, completed_at=datetime.now())
+        await self.finalize_account_processing(account, actions_dict, previous_status, account_logger, base_log_context)
+
+    def track_in_flight(self, account: AccountRecord, action, action_num: int, in_flight: TransfersInFlight,
+                        actions_dict: dict[str, list], account_logger, base_log_context: dict):
+        task = asyncio.create_task(self.resume_after_delivery(account, action, action_num, in_flight, actions_dict,
+                                                              account_logger, base_log_context))
+        self.in_flight.add(task)
+        task.add_done_callback(self.in_flight.discard)
+
+    async def resume_after_delivery(self, account: AccountRecord, action, action_num: int,
+                                    in_flight: TransfersInFlight, actions_dict: dict[str, list], account_logger,
+                                    base_log_context: dict):
+        """
+        Ждет доставки переводов действия и завершает проход аккаунта так же, как после любого другого действия:
+        одно действие за проход, следующее выполнится при следующем запуске. Недоставленные переводы - FAILED
+        """
+        try:
+            delivered = await in_flight.wait()
+        except Exception as e:
+            account_logger.error(f"{excname(e)} Error tracking transfers of {action.action_name}: {e}")
+            delivered = False
+
+        actions_dict[action.action_name].append(delivered)
+        if not delivered:
+            account_logger.error(f"Transfers of {action.action_name} were not delivered: {in_flight.results}")
+            await status_buffer.update(action, status=RouteStatus.FAILED, completed_at=datetime.now())
+            await status_buffer.update(account.route, status=RouteStatus.FAILED, completed_at=datetime.now())
+            await self.finalize_account_processing(account, actions_dict, RouteStatus.IN_PROGRESS, account_logger,
+                                                   base_log_context)
+            return
+
+        account_logger.success(f"Completed action {action.action_name}: {in_flight.results}")
+        await status_buffer.update(action, status=RouteStatus.COMPLETED, completed_at=datetime.now())
+        if action_num < len(account.route.actions):
+            delay = random.randint(settings.delays.action_delay[0], settings.delays.action_delay[1])
+            account_logger.info(f"Sleeping for 💤{delay}💤 seconds before next action")
+            await asyncio.sleep(delay)
+
+        await self.complete_route(account, actions_dict, account_logger, base_log_context)
+
+    async def wait_in_flight(self):
+        """Ждет аккаунты с переводами в пути"""
+        while self.in_flight:
+            self.logger.info(f"Waiting for delivery of cross-chain transfers of {len(self.in_flight)} account(s)")
+            await asyncio.gather(*list(self.in_flight), return_exceptions=True)
+
     async def finalize_account_processing(self, account, actions_dict, previous_status, account_logger, base_log_context):
         # Используем блокировку для безопасного обновления счетчика
         async with self.completed_accounts_lock:
@@ -257,24 +305,14 @@ class AccountManager:
 
     async def launch(self, rerun_failed = False):
         """Запускает обработку всех flows"""
-        session = db.Session()
         try:
-            if rerun_failed:
-                accounts_from_db = session.query(Account).join(
-                    Account.route
-                ).join(
-                    Route.actions
-                ).filter(
-                    RouteAction.status.in_([RouteStatus.FAILED])
-                ).options(
-                    joinedload(Account.route).joinedload(Route.actions)
-                ).all()
-            else:
-                accounts_from_db = session.query(Account).join(Account.route).options(
-                    joinedload(Account.route).joinedload(Route.actions)
-                ).filter(
-                    Route.status.in_([RouteStatus.PENDING, RouteStatus.IN_PROGRESS])
-                ).all()
+            # Аккаунты с маршрутами, действиями и параметрами загружаются один раз на весь запуск
+            accounts_from_db = await db.run(db.load_run_snapshot, rerun_failed)
+            try:
+                preset_params_cache.prepare(action for account in accounts_from_db for action in account.route.actions)
+            except ValueError as e:
+                self.logger.error(f"Invalid preset params: {e}")
+                return
 
             if settings.general.SHUFFLE_ACCOUNTS:
                 random.shuffle(accounts_from_db)
@@ -291,6 +329,7 @@ class AccountManager:
             self.logger.info(f"Loaded {account_max} accounts with pending/in-progress routes")
             self.create_flows()
             await self.process_flows(rerun_failed)
+            await self.wait_in_flight()
 
             self.logger.success(f"All flows finished...")
             await self.tg_notificator.send_notification_for_all_done(account_max)
@@ -298,8 +337,12 @@ class AccountManager:
         except asyncio.CancelledError:
             if settings.logging.debug_logging:
                 self.logger.debug("Gracefully shutting down...")
+            for task in list(self.in_flight):
+                task.cancel()
+            await asyncio.gather(*list(self.in_flight), return_exceptions=True)
             # Здесь можно добавить cleanup код если нужно
             raise  # Важно пробросить CancelledError дальше
 
         finally:
-            session.close()
+            # дописываем статусы, которые еще не попали в базу
+            await status_buffer.close()
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Callable, Iterable
+
+from core.config import AUXILIARY_DATA_DIR
+from core.logger import get_logger
+from utils.utils import read_json, write_json
+
+# Модуль импортируется процессами пула, поэтому в нем нет тяжелых импортов, библиотеки сетей грузятся по требованию
+
+CACHE_PATH = os.path.join(AUXILIARY_DATA_DIR, 'derived_addresses.json')
+CHUNK_SIZE = 250  # ключей в одной задаче пула
+PARALLEL_THRESHOLD = 500  # меньше ключей быстрее посчитать в текущем процессе
+
+CHAINS = ("evm", "aptos", "solana")
+# сети, адреса которых нужны действиям проекта (первое слово действия в пресете)
+PROJECT_CHAINS = {
+    "jumper": ("evm",),
+}
+# необязательные библиотеки сетей, см. requirements.txt
+CHAIN_PACKAGES = {
+    "aptos": "aptos-sdk",
+    "solana": "solders",
+}
+
+
+def _derive_evm(private_key: str) -> str:
+    from eth_account import Account
+    return Account.from_key(private_key).address
+
+
+def _derive_aptos(private_key: str) -> str:
+    from aptos_sdk.account import Account
+    return str(Account.load_key(private_key).address())
+
+
+def _derive_solana(private_key: str) -> str:
+    from solders.keypair import Keypair
+    return str(Keypair.from_base58_string(private_key).pubkey())
+
+
+DERIVERS: dict[str, Callable[[str], str]] = {
+    "evm": _derive_evm,
+    "aptos": _derive_aptos,
+    "solana": _derive_solana,
+}
+
+
+def _derive_chunk(chain: str, private_keys: list[str]) -> list[str]:
+    derive = DERIVERS[chain]
+    return [derive(private_key) for private_key in private_keys]
+
+
+def preset_chains(preset_data: dict) -> tuple[str, ...]:
+    """Сети, адреса которых нужны действиям пресета. EVM адрес нужен всегда (логи, уведомления)"""
+    chains = {"evm"}
+    for action_type in preset_data["functions"]:
+        chains.update(PROJECT_CHAINS.get(str(action_type).split("_")[0].lower(), ()))
+    return tuple(chain for chain in CHAINS if chain in chains)
+
+
+class AddressDeriver:
+    """
+    Derives addresses from private keys in a process pool and caches them on disk.
+
+    The cache in core/auxiliary_data/derived_addresses.json is keyed by sha256 of the chain and the private key,
+    so the keys themselves are not stored. Only keys missing in the cache are derived, in chunks of CHUNK_SIZE.
+    """
+    def __init__(self, cache_path: str = CACHE_PATH) -> None:
+        self.cache_path = cache_path
+        self._cache: dict[str, str] | None = None
+        self.logger = get_logger(class_name=self.__class__.__name__)
+
+    @staticmethod
+    def _cache_key(chain: str, private_key: str) -> str:
+        return hashlib.sha256(f"{chain}:{private_key}".encode()).hexdigest()
+
+    def _load_cache(self) -> dict[str, str]:
+        if self._cache is None:
+            try:
+                self._cache = read_json(self.cache_path)
+            except (FileNotFoundError, ValueError):
+                self._cache = {}
+        return self._cache
+
+    def derive(self, chain: str, private_keys: Iterable[str]) -> dict[str, str]:
+        """
+        :param str chain: "evm", "aptos" or "solana"
+        :param private_keys: the private keys
+        :return dict[str, str]: addresses by private key
+        """
+        cache = self._load_cache()
+        private_keys = set(private_keys)
+        missing = [private_key for private_key in private_keys if self._cache_key(chain, private_key) not in cache]
+
+        if missing:
+            if len(missing) < PARALLEL_THRESHOLD:
+                addresses = _derive_chunk(chain, missing)
+            else:
+                chunks = [missing[i:i + CHUNK_SIZE] for i in range(0, len(missing), CHUNK_SIZE)]
+                with ProcessPoolExecutor() as executor:
+                    addresses = [address for chunk in executor.map(_derive_chunk, repeat(chain), chunks)
+                                 for address in chunk]
+
+            for private_key, address in zip(missing, addresses):
+                cache[self._cache_key(chain, private_key)] = address
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            write_json(self.cache_path, cache)
+
+        return {private_key: cache[self._cache_key(chain, private_key)] for private_key in private_keys}
+
+    def fill(self, accounts: list, chains: Iterable[str] = CHAINS) -> None:
+        """
+        Sets <chain>_address of the accounts (AccountData) for the chains, other chains are skipped.
+        Blocks for a while on large tables, call it from a thread in async code.
+        """
+        for chain in chains:
+            key_field, address_field = f"{chain}_private_key", f"{chain}_address"
+            with_keys = [account for account in accounts if getattr(account, key_field)]
+            if not with_keys:
+                continue
+            try:
+                addresses = self.derive(chain, (getattr(account, key_field) for account in with_keys))
+            except ImportError as e:
+                self.logger.error(f"{len(with_keys)} accounts have {chain} private keys, but {e.name} is not "
+                                  f"installed, {chain} addresses are not set. Install it: "
+                                  f"pip install {CHAIN_PACKAGES.get(chain, e.name)}")
+                continue
+            for account in with_keys:
+                setattr(account, address_field, addresses[getattr(account, key_field)])
+
+
+address_deriver = AddressDeriver()
@@ -1,5 +1,8 @@
 import os
 import asyncio
+import csv
+import importlib.util
+import itertools
 import json
 from json import JSONDecodeError
 from pathlib import Path
@@ -12,10 +15,12 @@ from sqlalchemy.exc import OperationalError
 from termcolor import cprint
 from art import text2art
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment
 
 from core.db_utils.db import db
 from core.db_utils.models import RouteStatus, Route
+from core.preset_params import compile_params, preset_params_cache
 from utils.utils import read_toml
 
 console = Console()
@@ -78,12 +83,16 @@ async def edit_preset_params():
     new_params = await questionary.text(f"Enter edited parameters:").ask_async()
     new_params = new_params.strip().replace("True", "true").replace("False", "false").replace("None", "null").replace("'", '"')
     try:
-        json.loads(new_params)
+        compile_params(new_params)
     except JSONDecodeError:
         console.print(f"[red]Invalid JSON format. Please enter valid JSON.[/red]")
         return
+    except ValueError as e:
+        console.print(f"[red]Invalid parameters: {e}[/red]")
+        return
 
     await db.update_obj_column(params_object, "action_params", new_params)
+    preset_params_cache.invalidate(params_object.id)
     console.print(f"[green]Parameters updated successfully.[/green]")
 
 async def display_accounts_paginated(route_status: RouteStatus):
@@ -167,9 +176,75 @@ async def display_accounts_paginated(route_status: RouteStatus):
             return
 
 
-async def export_accounts_results_to_excel():
+REPORT_HEADERS = ["Account Name", "Action", "Status", "Completed At"]
+REPORT_COLUMN_WIDTHS = [30, 40, 14, 22]
+REPORT_BATCH_SIZE = 1000
+REPORT_FORMATS = {"Excel": "xlsx", "CSV": "csv", "Parquet": "parquet"}
+
+
+def _available_report_formats() -> list[str]:
+    """Форматы отчета, parquet только если установлен необязательный pyarrow"""
+    formats = [name for name, extension in REPORT_FORMATS.items() if extension != "parquet"]
+    if importlib.util.find_spec("pyarrow"):
+        formats.append("Parquet")
+    return formats
+
+
+def _report_rows():
+    """Строки отчета в виде значений ячеек"""
+    for name, action_name, status, completed_at in db.iter_report_rows(REPORT_BATCH_SIZE):
+        yield (
+            name,
+            action_name if action_name is not None else "No actions",
+            status.name,
+            completed_at.strftime("%d/%m/%Y, %H:%M:%S") if completed_at else "Not completed yet",
+        )
+
+
+def _write_report_xlsx(filename: str):
+    # write-only книга пишет строки сразу в файл и не держит ячейки в памяти
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Accounts Report")
+    for letter, width in zip("ABCD", REPORT_COLUMN_WIDTHS):
+        ws.column_dimensions[letter].width = width
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    centered = Alignment(horizontal="center", vertical="center")
+    header = []
+    for title in REPORT_HEADERS:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = centered
+        header.append(cell)
+    ws.append(header)
+
+    for row in _report_rows():
+        ws.append(row)
+    wb.save(filename)
+
+
+def _write_report_csv(filename: str):
+    with open(filename, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_HEADERS)
+        writer.writerows(_report_rows())
+
+
+def _write_report_parquet(filename: str):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(header, pa.string()) for header in REPORT_HEADERS])
+    with pq.ParquetWriter(filename, schema) as writer:
+        for batch in itertools.batched(_report_rows(), REPORT_BATCH_SIZE):
+            writer.write_table(pa.Table.from_pylist([dict(zip(REPORT_HEADERS, row)) for row in batch], schema))
+
+
+async def export_accounts_results(report_format: str = "xlsx"):
     """
-    Экспортирует данные аккаунтов и их действий в Excel файл.
+    Экспортирует данные аккаунтов и их действий в файл xlsx, csv или parquet.
     Столбцы: имя аккаунта, действие, статус, время завершения
     """
     try:
@@ -179,86 +254,17 @@ async def export_accounts_results_to_excel():
 
         # Создаем имя файла с текущей датой и временем
         current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        filename = os.path.join(reports_dir, f"accounts_report_{current_time}.xlsx")
-
-        # Создаем новую рабочую книгу и выбираем активный лист
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Accounts Report"
-
-        # Определяем стили
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        centered = Alignment(horizontal="center", vertical="center")
-        thin_border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin")
-        )
+        filename = os.path.join(reports_dir, f"accounts_report_{current_time}.{report_format}")
 
-        # Добавляем заголовки
-        headers = ["Account Name", "Action", "Status", "Completed At"]
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = centered
-            cell.border = thin_border
-
-        # Получаем все маршруты из базы данных
-        all_routes = []
-        for status in RouteStatus:
-            routes = db.get_routes_by_statuses([status])
-            all_routes.extend(routes)
-
-        # Заполняем данные
-        row_num = 2
-        for route in all_routes:
-            account = db.get_account_by_id(route.account_id)
-            route_completed = route.completed_at.strftime("%d/%m/%Y, %H:%M:%S") if route.completed_at else "Not completed yet"
-
-            # Если у маршрута нет действий, добавляем одну строку с информацией о маршруте
-            if not route.actions:
-                ws.cell(row=row_num, column=1, value=account.name).border = thin_border
-                ws.cell(row=row_num, column=2, value="No actions").border = thin_border
-                ws.cell(row=row_num, column=3, value=route.status.name).border = thin_border
-                ws.cell(row=row_num, column=4, value=route_completed).border = thin_border
-                row_num += 1
-            else:
-                # Для каждого действия добавляем отдельную строку
-                for action in route.actions:
-                    action_completed = action.completed_at.strftime(
-                        "%d/%m/%Y, %H:%M:%S") if action.completed_at else "Not completed yet"
-
-                    ws.cell(row=row_num, column=1, value=account.name).border = thin_border
-                    ws.cell(row=row_num, column=2, value=action.action_name).border = thin_border
-                    ws.cell(row=row_num, column=3, value=action.status.name).border = thin_border
-                    ws.cell(row=row_num, column=4, value=action_completed).border = thin_border
-                    row_num += 1
-
-        # Автоматически регулируем ширину столбцов
-        for col in ws.columns:
-            max_length = 0
-            column = col[0].column_letter
-            for cell in col:
-                if cell.value:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-            adjusted_width = (max_length + 2)
-            ws.column_dimensions[column].width = adjusted_width
-
-        # Сохраняем файл
-        wb.save(filename)
+        writers = {"xlsx": _write_report_xlsx, "csv": _write_report_csv, "parquet": _write_report_parquet}
+        # строки читаются из базы пачками и сразу пишутся в файл
+        await asyncio.to_thread(writers[report_format], filename)
 
         console.print(f"[green]Отчет успешно сохранен в файл: {filename}[/green]")
         return filename
 
     except Exception as e:
-        console.print(f"[red]Ошибка при экспорте данных в Excel: {str(e)}[/red]")
+        console.print(f"[red]Ошибка при экспорте данных: {str(e)}[/red]")
         return None
 
 
@@ -287,7 +293,7 @@ async def main_menu():
                 "Rerun Failed Actions",
                 "Edit Current Preset Parameters",
                 "View All Accounts by Status",
-                "Export Accounts Results to Excel",
+                "Export Accounts Results",
                 "Exit"
             ]
         ).ask_async()
@@ -331,15 +337,21 @@ async def main_menu():
             selected_status = RouteStatus[status_choice]
             await display_accounts_paginated(selected_status)
 
-        elif choice == "Export Accounts Results to Excel":
-            console.print("[yellow]Exporting accounts data to Excel file...[/yellow]")
-            filename = await export_accounts_results_to_excel()
-            if filename:
-                open_file = await questionary.confirm(
-                    f"Excel file created. Want to open it now?"
-                ).ask_async()
-                if open_file:
-                    os.startfile(filename)
+        elif choice == "Export Accounts Results":
+            format_choice = await questionary.select(
+                "Select report format:",
+                choices=_available_report_formats() + ["Back"]
+            ).ask_async()
+            # None, если выбор отменен (Ctrl+C)
+            if format_choice not in (None, "Back"):
+                console.print(f"[yellow]Exporting accounts data to {format_choice} file...[/yellow]")
+                filename = await export_accounts_results(REPORT_FORMATS[format_choice])
+                if filename:
+                    open_file = await questionary.confirm(
+                        f"{format_choice} file created. Want to open it now?"
+                    ).ask_async()
+                    if open_file:
+                        os.startfile(filename)
 
         elif choice == "Exit":
             return None
@@ -1,85 +1,288 @@
+import asyncio
+import hashlib
 import json
 import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Type
+from functools import partial
+from typing import Type, Callable, TypeVar
 from pathlib import Path
 from dataclasses import asdict
 
-from sqlalchemy import create_engine, text, update, func
+from sqlalchemy import create_engine, text, update, func, event, inspect, select, insert, delete, or_
 from sqlalchemy.exc import DatabaseError
-from sqlalchemy.orm import Session, sessionmaker, joinedload
+from sqlalchemy.orm import Session, sessionmaker, joinedload, selectinload
 
 from core.db_utils.models import Route, RouteStatus, Base, Account, SpareProxy, RouteAction, ActionParams
+from core.db_utils.records import AccountRecord, to_records
+from core.address_derivation import CHAINS, address_deriver
 from core.excel import AccountData
 from core import config
 from core.logger import get_logger
 from core.init_settings import settings
 
+T = TypeVar("T")
+
 
 class DatabaseManager:
+    _insert_chunk_size = 5000  # строк в одном executemany при генерации маршрутов
+    _in_chunk_size = 500  # значений в одном IN (...)
+
     def __init__(self, db_path: str = config.DATABASE, debug = settings.logging.debug_logging):
         self.db_path = Path(db_path)
+        # SQLite допускает только одного писателя, поэтому все записи идут через одно соединение,
+        # а чтения (CLI, загрузка маршрутов) - через пул читателей, которые в режиме WAL не ждут писателя
         self.engine = create_engine(f'sqlite:///{db_path}',
-                                    pool_size=100,  # Максимальное количество одновременных соединений
-                                    max_overflow=0, # Дополнительные соединения сверх pool_size
+                                    pool_size=1,  # единственное соединение для записи
+                                    max_overflow=0,
                                     # echo=debug
                                     )
+        self.read_engine = create_engine(f'sqlite:///{db_path}',
+                                         pool_size=settings.database.reader_pool_size,
+                                         max_overflow=0,
+                                         )
+        for engine in (self.engine, self.read_engine):
+            event.listen(engine, "connect", self._apply_pragmas)
+
         self.Session = sessionmaker(bind=self.engine)
-        self.conn = self.engine.connect()
+        self.ReadSession = sessionmaker(bind=self.read_engine)
         self.logger = get_logger(class_name=self.__class__.__name__)
         self.__debug = debug
+        # все обращения к базе из асинхронного кода идут через один поток, чтобы не блокировать event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+
+        # миграция: колонки и индексы, добавленные в модели после создания базы
+        if self._has_tables():
+            self.ensure_columns()
+            self.ensure_indexes()
+            if debug:
+                self.check_query_plans()
+
+    @staticmethod
+    def _apply_pragmas(dbapi_connection, connection_record):
+        """Применяет профиль SQLite из settings.database к новому соединению"""
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={settings.database.journal_mode}")
+            cursor.execute(f"PRAGMA synchronous={settings.database.synchronous}")
+            cursor.execute(f"PRAGMA mmap_size={int(settings.database.mmap_size)}")
+            cursor.execute(f"PRAGMA cache_size={int(settings.database.cache_size)}")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings.database.busy_timeout_ms)}")
+        finally:
+            cursor.close()
 
+    def _has_tables(self) -> bool:
+        return inspect(self.read_engine).has_table('accounts')
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Runs the blocking database function in the database thread.
+
+        :param func: the function, e.g. db.get_spare_proxies
+        :param args: positional arguments of the function
+        :param kwargs: keyword arguments of the function
+        :return: the result of the function
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
 
     def init_db(self):
         """Создает все таблицы"""
         Base.metadata.create_all(self.engine)
 
-    def add_accounts(self, accounts: list[AccountData], spare_proxies: list[str]):
-        """Загружает аккаунты и прокси в базу"""
-        if self.__debug:
-            self.logger.info(f"Starting to add {len(accounts)} accounts to database")
+    def ensure_columns(self):
+        """Добавляет в существующие таблицы колонки из моделей, которых в них нет"""
+        # у писателя одно соединение, поэтому инспектор работает через уже открытое соединение транзакции
+        with self.engine.begin() as conn:
+            inspector = inspect(conn)
+            for table in Base.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue
+                existing = {column["name"] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing:
+                        continue
+                    column_type = column.type.compile(dialect=self.engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+                    self.logger.info(f"Added column {table.name}.{column.name}")
+
+    def ensure_indexes(self):
+        """Создает индексы из моделей, которых нет в уже существующей базе"""
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+
+    def explain_query_plan(self, stmt) -> list[str]:
+        """
+        Returns the SQLite query plan of the statement.
 
-        # Убеждаемся, что таблицы созданы
-        if not self.engine.dialect.has_table(self.conn, 'accounts'):
-            if self.__debug:
-                self.logger.info("Creating database tables...")
+        :param stmt: a select statement
+        :return list[str]: the detail column of EXPLAIN QUERY PLAN
+        """
+        compiled = stmt.compile(dialect=self.read_engine.dialect, compile_kwargs={"literal_binds": True})
+        with self.read_engine.connect() as conn:
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+        return [row[-1] for row in rows]
+
+    def check_query_plans(self) -> bool:
+        """
+        Checks that the hot queries don't scan whole tables.
+
+        The statements are built by the same methods the application queries with, the report and the list of
+        spare proxies read their whole table by design, so only that table may be scanned.
+        """
+        statuses = [RouteStatus.PENDING, RouteStatus.IN_PROGRESS]
+        # запрос -> (statement, таблица, которую запрос читает целиком)
+        hot_queries = {
+            "launch": (self.run_snapshot_stmt(), None),
+            "rerun failed": (self.run_snapshot_stmt(rerun_failed=True), None),
+            # selectinload в load_run_snapshot
+            "account routes": (select(Route).where(Route.account_id.in_([1])), None),
+            "route actions": (select(RouteAction).where(RouteAction.route_id.in_([1]))
+                              .order_by(RouteAction.order_index), None),
+            "routes paginated": (self.routes_page_stmt(statuses), None),
+            "routes count": (self.routes_count_stmt(statuses), None),
+            "report": (self.report_rows_stmt(), "routes"),
+            "spare proxies": (self.spare_proxies_stmt(), "spare_proxies"),
+            "proxy state": (self.proxy_in_use_stmt("", True), None),
+        }
+
+        all_indexed = True
+        for name, (stmt, full_read) in hot_queries.items():
+            plan = self.explain_query_plan(stmt)
+            # проход по подзапросу (anon_1 при joinedload с limit) не считается, только по таблицам моделей
+            full_scans = [detail for detail in plan if detail.startswith("SCAN") and "USING" not in detail
+                          and detail.split()[1] in Base.metadata.tables and detail.split()[1] != full_read]
+            if full_scans:
+                all_indexed = False
+                self.logger.warning(f"Query '{name}' scans the whole table: {full_scans}")
+            else:
+                self.logger.info(f"Query '{name}': {plan}")
+
+        return all_indexed
+
+    @staticmethod
+    def row_hash(row: dict) -> str:
+        return hashlib.sha256(json.dumps(row, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def _normalize_private_key(private_key: str | None) -> str | None:
+        if not private_key:
+            return None
+        private_key = private_key.strip()
+        return private_key if private_key.startswith('0x') else f'0x{private_key}'
+
+    def _in_chunks(self, values: list) -> list[list]:
+        return [values[i:i + self._in_chunk_size] for i in range(0, len(values), self._in_chunk_size)]
+
+    def _delete_routes(self, session: Session, route_ids: list[int]):
+        for chunk in self._in_chunks(route_ids):
+            session.execute(delete(RouteAction).where(RouteAction.route_id.in_(chunk)))
+            session.execute(delete(Route).where(Route.id.in_(chunk)))
+
+    def sync_accounts(self, rows: list[dict], spare_proxies: list[str],
+                      chains: tuple[str, ...] = CHAINS) -> dict[str, int]:
+        """
+        Incrementally syncs accounts and spare proxies with the rows of the table.
+
+        Rows are matched to accounts by the EVM private key (by name if there is no key). Unchanged rows (same
+        row_hash) are skipped, changed ones are updated keeping the user agent of the account, addresses and
+        user agents are derived only for new and changed rows (addresses only for the given chains). Accounts missing in the table are deleted
+        together with their routes.
+
+        :param rows: rows from ExcelManager.load_rows
+        :param spare_proxies: spare proxies from the table
+        :param chains: chains to derive addresses for, see preset_chains
+        :return dict[str, int]: the number of added, updated, unchanged and deleted accounts
+        """
+        if not self._has_tables():
             self.init_db()
 
         session = self.Session()
         try:
-            # Добавляем аккаунты
-            for account_data in accounts:
-                if self.__debug:
-                    self.logger.debug(f"Adding account {account_data.name}")
-
-                account = Account(**asdict(account_data))
-                session.add(account)
-
-            # Сохраняем запасные прокси
-            for proxy in spare_proxies:
-                if self.__debug:
-                    self.logger.debug(f"Adding spare proxy {proxy}")
-                spare_proxy = SpareProxy(proxy=proxy)
-                session.add(spare_proxy)
+            existing = session.execute(select(Account.id, Account.name, Account.row_hash,
+                                              *(getattr(Account, f"{chain}_private_key") for chain in CHAINS),
+                                              *(getattr(Account, f"{chain}_address") for chain in CHAINS))).all()
+            by_key = {account.evm_private_key: account for account in existing if account.evm_private_key}
+            by_name = {account.name: account for account in existing}
+
+            now = datetime.now()
+            seen_ids, changed = set(), []
+            for row in rows:
+                row_hash = self.row_hash(row)
+                private_key = self._normalize_private_key(row["evm_private_key"])
+                found = by_key.get(private_key) if private_key else by_name.get(row["name"].strip())
+                if found:
+                    seen_ids.add(found.id)
+                    # адрес мог быть не вычислен, если прошлый пресет не использовал эту сеть
+                    addresses_ready = all(getattr(found, f"{chain}_address") or not row.get(f"{chain}_private_key")
+                                          for chain in chains)
+                    if found.row_hash == row_hash and addresses_ready:
+                        continue
+                changed.append((found, row_hash, AccountData(**row)))
+
+            # адреса считаются только для новых и измененных строк и только для нужных сетей
+            address_deriver.fill([account_data for *_, account_data in changed], chains)
+
+            new_rows, updated_rows = [], []
+            for found, row_hash, account_data in changed:
+                values = asdict(account_data) | {"row_hash": row_hash, "updated_at": now}
+                if found:
+                    # user agent и адреса не нужных пресету сетей остаются прежними, если ключ сети не изменился,
+                    # иначе адрес сбрасывается и будет вычислен, когда сеть понадобится пресету
+                    for derived in ("user_agent", "os_user_agent", "chrome_version"):
+                        values.pop(derived)
+                    for chain in CHAINS:
+                        if chain in chains:
+                            continue
+                        if getattr(found, f"{chain}_private_key") == values[f"{chain}_private_key"]:
+                            values.pop(f"{chain}_address")
+                        else:
+                            values[f"{chain}_address"] = None
+                    updated_rows.append(values | {"id": found.id})
+                else:
+                    new_rows.append(values | {"created_at": now})
+
+            removed_ids = [account_id for account_id, *_ in existing if account_id not in seen_ids]
+            if removed_ids:
+                route_ids = []
+                for chunk in self._in_chunks(removed_ids):
+                    route_ids += session.scalars(select(Route.id).where(Route.account_id.in_(chunk))).all()
+                self._delete_routes(session, route_ids)
+                for chunk in self._in_chunks(removed_ids):
+                    session.execute(delete(Account).where(Account.id.in_(chunk)))
+
+            for start in range(0, len(updated_rows), self._insert_chunk_size):
+                session.execute(update(Account), updated_rows[start:start + self._insert_chunk_size])
+            for start in range(0, len(new_rows), self._insert_chunk_size):
+                session.execute(insert(Account), new_rows[start:start + self._insert_chunk_size])
+
+            # Запасные прокси
+            existing_proxies = set(session.scalars(select(SpareProxy.proxy)))
+            new_proxies = [proxy for proxy in spare_proxies if proxy not in existing_proxies]
+            removed_proxies = list(existing_proxies - set(spare_proxies))
+            if new_proxies:
+                session.execute(insert(SpareProxy), [{"proxy": proxy, "created_at": now} for proxy in new_proxies])
+            for chunk in self._in_chunks(removed_proxies):
+                session.execute(delete(SpareProxy).where(SpareProxy.proxy.in_(chunk)))
 
             session.commit()
-            if self.__debug:
-                self.logger.success(f"Successfully added {len(accounts)} accounts to database")
-
-            # Проверяем что аккаунты действительно добавились
-            count = session.query(Account).count()
-            self.logger.info(f"Total accounts in database: {count}")
+            stats = {"added": len(new_rows), "updated": len(updated_rows),
+                     "unchanged": len(seen_ids) - len(updated_rows), "deleted": len(removed_ids)}
+            self.logger.info(f"Accounts synced: {stats}, spare proxies: +{len(new_proxies)} -{len(removed_proxies)}")
+            return stats
 
         except Exception as e:
             session.rollback()
-            self.logger.error(f"Error adding accounts to database: {e}")
+            self.logger.error(f"Error syncing accounts: {e}")
             raise
         finally:
             session.close()
 
     def get_routes_by_statuses(self, route_statuses: list[RouteStatus]) -> list[Type[Route]]:
         """Получает все маршруты c определенным статусом"""
-        session = self.Session()
+        session = self.ReadSession()
         try:
             # Используем joinedload для загрузки связанных actions вместе с маршрутами
             return session.query(Route).options(
@@ -90,6 +293,18 @@ class DatabaseManager:
         finally:
             session.close()
 
+    @staticmethod
+    def routes_page_stmt(statuses: list[RouteStatus], limit: int = 20, offset: int = 0):
+        return select(Route).options(
+            joinedload(Route.actions)  # Предварительно загружаем actions
+        ).where(
+            Route.status.in_(statuses)
+        ).order_by(Route.account_id).limit(limit).offset(offset)  # Сортировка для стабильной пагинации
+
+    @staticmethod
+    def routes_count_stmt(statuses: list[RouteStatus]):
+        return select(func.count(Route.id)).where(Route.status.in_(statuses))
+
     def get_routes_by_statuses_paginated(self, statuses: list[RouteStatus], limit: int = 20, offset: int = 0) -> list[Route]:
         """
         Получает маршруты с указанными статусами с поддержкой пагинации.
@@ -102,30 +317,45 @@ class DatabaseManager:
         Returns:
             Список объектов Route с указанными статусами, ограниченный параметрами пагинации
         """
-        session = self.Session()
+        session = self.ReadSession()
 
         try:
             self.logger.debug(f"getting paginated routes")
-            query = session.query(Route).options(
-                joinedload(Route.actions)  # Предварительно загружаем actions
-            ).filter(
-                Route.status.in_(statuses)
-            )
-
-            # Применяем пагинацию
-            query = query.order_by(Route.account_id)  # Сортировка для стабильной пагинации # completed_at.desc()
-            query = query.limit(limit).offset(offset)
-
-            # Выполняем запрос и возвращаем результаты
-            routes = query.all()
-
-            return routes
+            return list(session.scalars(self.routes_page_stmt(statuses, limit, offset)).unique())
         except Exception as e:
             self.logger.exception(f"Ошибка при получении маршрутов с пагинацией: {e}")
             return []
         finally:
             session.close()
 
+    @staticmethod
+    def report_rows_stmt():
+        return select(
+            Account.name, Route.status, Route.completed_at,
+            RouteAction.action_name, RouteAction.status, RouteAction.completed_at,
+        ).join(Account, Account.id == Route.account_id).outerjoin(
+            RouteAction, RouteAction.route_id == Route.id
+        ).order_by(Route.account_id, RouteAction.order_index)
+
+    def iter_report_rows(self, batch_size: int = 1000):
+        """
+        Streams rows of the accounts report: account name, action name, status and completion time.
+
+        One joined query is read in batches of batch_size rows (yield_per), a route without actions gives
+        one row with action None and the status of the route.
+        """
+        stmt = self.report_rows_stmt().execution_options(yield_per=batch_size)
+
+        session = self.ReadSession()
+        try:
+            for name, route_status, route_completed, action_name, action_status, action_completed in session.execute(stmt):
+                if action_status is None:
+                    yield name, None, route_status, route_completed
+                else:
+                    yield name, action_name, action_status, action_completed
+        finally:
+            session.close()
+
     def get_routes_count_by_statuses(self, statuses: list[RouteStatus]) -> int:
         """
         Возвращает общее количество маршрутов с указанными статусами.
@@ -136,13 +366,10 @@ class DatabaseManager:
         Returns:
             Общее количество маршрутов с указанными статусами
         """
-        session = self.Session()
+        session = self.ReadSession()
 
         try:
-            count = session.query(func.count(Route.id)).filter(
-                Route.status.in_(statuses)
-            ).scalar()
-            return count
+            return session.scalar(self.routes_count_stmt(statuses))
         except Exception as e:
             self.logger.error(f"Ошибка при получении количества маршрутов: {e}")
             return 0
@@ -151,188 +378,121 @@ class DatabaseManager:
 
 
     @staticmethod
-    def _shuffle_order_indexes(action_list: list[RouteAction]):
-        indexes = [action.order_index for action in action_list]
+    def _shuffle_order_indexes(action_list: list[dict]):
+        indexes = [action["order_index"] for action in action_list]
         random.shuffle(indexes)
         for action in action_list:
-            action.order_index = indexes.pop()
+            action["order_index"] = indexes.pop()
         return action_list
 
+    @staticmethod
+    def _build_route_actions(preset_data: dict[str, dict], route_id: int, params_id: int,
+                             created_at: datetime) -> list[dict]:
+        """Строки действий маршрута с учетом repeat_actions"""
+        actions = []
+        repeat_actions = preset_data.get("repeat_actions") or {}
+        for index, (action_type, action_name) in enumerate(preset_data["functions"].items()):
+            repeat_num = 1
+            if str(action_type) in repeat_actions:
+                repeat_data = repeat_actions[str(action_type)]
+                repeat_num = random.randint(repeat_data[0], repeat_data[1])
+
+            actions.extend({
+                "route_id": route_id,
+                "action_type": str(action_type),
+                "action_name": str(action_name),
+                "params_id": params_id,
+                "status": RouteStatus.PENDING,
+                "created_at": created_at,
+                "order_index": index,  # Устанавливаем порядковый индекс
+            } for _ in range(repeat_num))
+
+        return actions
+
+
+    @staticmethod
+    def preset_hash(preset_data: dict[str, dict]) -> str:
+        preset = {key: preset_data.get(key) for key in ("functions", "repeat_actions", "functions_params")}
+        return hashlib.sha256(json.dumps(preset, sort_keys=True, default=str).encode()).hexdigest()
 
     def generate_routes_for_accounts(self, preset_data: dict[str, dict]):
-        """Создает маршрут для каждого аккаунта, если у него еще нет маршрута"""
+        """
+        Создает маршрут для каждого аккаунта, если у него еще нет маршрута.
+        Маршруты другого пресета и уже начатые маршруты пересоздаются, не начатые маршруты этого пресета остаются
+        """
         if self.__debug:
             self.logger.info("Starting route generation")
 
+        preset_hash = self.preset_hash(preset_data)
         session = self.Session()
         try:
-            # Проверяем текущее состояние базы
-            routes_before = session.query(Route).count()
-            actions_before = session.query(RouteAction).count()
+            stale_route_ids = session.scalars(select(Route.id).where(or_(
+                Route.preset_hash.is_(None), Route.preset_hash != preset_hash, Route.status != RouteStatus.PENDING
+            ))).all()
+            self._delete_routes(session, list(stale_route_ids))
+            # параметры, на которые больше не ссылается ни одно действие
+            session.execute(delete(ActionParams).where(
+                ~select(RouteAction.id).where(RouteAction.params_id == ActionParams.id).exists()
+            ))
             if self.__debug:
-                self.logger.info(f"Before generation: {routes_before} routes, {actions_before} actions")
+                self.logger.info(f"Deleted {len(stale_route_ids)} routes of other presets or already started")
 
-            # Получаем аккаунты с их текущими маршрутами
-            accounts = session.query(Account).options(joinedload(Account.route)).all()
+            # Аккаунты без маршрута
+            accounts = session.execute(
+                select(Account.id, Account.name).outerjoin(Route, Route.account_id == Account.id).where(Route.id.is_(None))
+            ).all()
             if self.__debug:
-                self.logger.info(f"Found {len(accounts)} accounts in database")
+                self.logger.info(f"Found {len(accounts)} accounts without route in database")
 
             self.logger.debug(f"functions_params {preset_data['functions_params']}")
             action_params_str = json.dumps(preset_data["functions_params"])
-            action_params_obj = ActionParams()
-            action_params_obj.action_params = action_params_str
-            session.add(action_params_obj)
-
-            for account in accounts:
-                try:
-                    # Проверяем, есть ли уже маршрут у аккаунта
-                    if account.route:
-                        self.logger.warning(f"Account {str(account.name)} already has route {account.route.id}, skipping")
-                        continue
-                    if self.__debug:
-                        self.logger.debug(f"Creating route for account {str(account.name)}")
-
-                    # Создаем новый маршрут для аккаунта
-                    route = Route()
-                    session.add(route)
-                    account.route = route  # Устанавливаем связь с аккаунтом
-
-                    # Создаем действия для маршрута
-                    for index, (action_type, action_name) in enumerate(preset_data["functions"].items()):
-                        if self.__debug:
-                            self.logger.debug(f"Adding action {action_name} to route")
-
-                        if preset_data.get("repeat_actions") and str(action_type) in preset_data["repeat_actions"]:
-                            repeat_data = preset_data["repeat_actions"][str(action_type)]
-                            repeat_num = random.randint(repeat_data[0], repeat_data[1])
-                            for _ in range(repeat_num):
-                                route_action = RouteAction(
-                                    action_type=str(action_type),
-                                    action_name=str(action_name),
-                                    order_index=index  # Устанавливаем порядковый индекс
-                                )
-                                route_action.action_params = action_params_obj
-                                session.add(route_action)
-                                route.actions.append(route_action)
+            # action_params уникальны, поэтому одинаковые параметры используются повторно
+            params_id = session.scalar(select(ActionParams.id).where(ActionParams.action_params == action_params_str))
+            if params_id is None:
+                action_params_obj = ActionParams(action_params=action_params_str, created_at=datetime.now())
+                session.add(action_params_obj)
+                session.flush()
+                params_id = action_params_obj.id
+
+            # Все строки считаются в памяти с явными id, затем вставляются пачками в одной транзакции
+            now = datetime.now()
+            next_route_id = (session.scalar(select(func.max(Route.id))) or 0) + 1
+            route_rows, action_rows = [], []
+            for route_id, (account_id, account_name) in enumerate(accounts, start=next_route_id):
+                route_rows.append({"id": route_id, "account_id": account_id, "preset_hash": preset_hash,
+                                   "status": RouteStatus.PENDING, "created_at": now})
+                route_actions = self._build_route_actions(preset_data, route_id, params_id, now)
+                if settings.general.SHUFFLE_ACTIONS:
+                    self._shuffle_order_indexes(route_actions)
+                action_rows.extend(route_actions)
 
-                        else:
-                            route_action = RouteAction(
-                                action_type=str(action_type),
-                                action_name=str(action_name),
-                                order_index=index  # Устанавливаем порядковый индекс
-                            )
-                            route_action.action_params = action_params_obj
-                            session.add(route_action)
-                            route.actions.append(route_action)
-
-                    if settings.general.SHUFFLE_ACTIONS:
-                        shuffled_actions = [action_ for action_ in route.actions]
-                        shuffled_actions = self._shuffle_order_indexes(shuffled_actions)
-
-                        route.actions = shuffled_actions
-
-                    session.flush()  # Применяем изменения для проверки
-                    if self.__debug:
-                        self.logger.success(f"Created route {route.id} with {len(route.actions)} actions for account {account.name}")
-
-                except Exception as e:
-                    self.logger.exception(f"{e.__class__.__name__} Error creating route for account {str(account.name)}: {str(e)}")
-                    continue
-
-            # Проверяем финальное состояние
-            routes_after = session.query(Route).count()
-
-            actions_after = session.query(RouteAction).count()
-            if self.__debug:
-                self.logger.info(f"After generation: {routes_after} routes (+{routes_after - routes_before}), "
-                           f"{actions_after} actions (+{actions_after - actions_before})")
-
-            session.commit()
-            self.logger.success("Successfully generated all routes")
-
-        except Exception as e:
-            session.rollback()
-            self.logger.error(f"Error in generate_routes_for_accounts: {e}")
-            raise
-        finally:
-            session.close()
-
-    def flush_routes(self):
-        """Удаляет все маршруты и их действия"""
-        session = self.Session()
-        try:
-            # Проверяем количество записей до удаления
-            routes_before = session.query(Route).count()
-            actions_before = session.query(RouteAction).count()
-            if self.__debug:
-                self.logger.info(f"Before deletion: {routes_before} routes, {actions_before} actions")
-
-            # Получаем все маршруты с их действиями
-            routes = session.query(Route).options(joinedload(Route.actions)).all()
-            if self.__debug:
-                self.logger.info(f"Found {len(routes)} routes to delete")
-
-            for route in routes:
                 if self.__debug:
-                    self.logger.info(f"Deleting route {route.id} with {len(route.actions)} actions")
-                session.delete(route)
-
-            session.flush()  # Применяем изменения, но не коммитим
+                    self.logger.debug(f"Prepared route {route_id} with {len(route_actions)} actions "
+                                      f"for account {account_name}")
 
-            # Проверяем количество записей после удаления
-            routes_after = session.query(Route).count()
-            actions_after = session.query(RouteAction).count()
-            if self.__debug:
-                self.logger.info(f"After deletion: {routes_after} routes, {actions_after} actions")
-
-            if actions_after > 0:
-                # Если действия остались, удаляем их явно
-                if self.__debug:
-                    self.logger.warning("Actions still exist, deleting them manually")
-                session.query(RouteAction).delete()
+            for start in range(0, len(route_rows), self._insert_chunk_size):
+                session.execute(insert(Route), route_rows[start:start + self._insert_chunk_size])
+            for start in range(0, len(action_rows), self._insert_chunk_size):
+                session.execute(insert(RouteAction), action_rows[start:start + self._insert_chunk_size])
 
             session.commit()
-
-            # Финальная проверка после коммита
-            final_routes = session.query(Route).count()
-            final_actions = session.query(RouteAction).count()
             if self.__debug:
-                self.logger.info(f"Final count: {final_routes} routes, {final_actions} actions")
-
-        except Exception as e:
-            session.rollback()
-            self.logger.error(f"Error deleting routes: {e}")
-            raise
-        finally:
-            session.close()
-
-    def delete_all_routes(self):
-        """Удаляет все маршруты из базы данных"""
-        session = self.Session()
-
-        # Убеждаемся, что таблицы созданы
-        if not self.engine.dialect.has_table(self.conn, 'accounts'):
-            self.logger.info(f"Database not found, creating tables...")
-            self.init_db()
-            self.logger.success(f"Created database")
-            return
-
-        try:
-            self.flush_routes()
+                self.logger.info(f"Generated {len(route_rows)} routes, {len(action_rows)} actions")
+            self.logger.success("Successfully generated all routes")
 
-            session.query(Account).delete()
-            session.query(SpareProxy).delete()
-            session.commit()
-            self.logger.success("Successfully flushed all routes")
         except Exception as e:
             session.rollback()
-            self.logger.error(f"Error flushing routes: {e}")
+            self.logger.error(f"Error in generate_routes_for_accounts: {e}")
             raise
         finally:
             session.close()
 
     async def update_obj_column(self, obj: Account | Route | RouteAction,
                                          attribute: str, update_info) -> Account | Route | RouteAction:
+        return await self.run(self._update_obj_column, obj, attribute, update_info)
+
+    def _update_obj_column(self, obj: Account | Route | RouteAction,
+                           attribute: str, update_info) -> Account | Route | RouteAction:
         session = self.Session()
         try:
             # Получаем свежую версию объекта из базы
@@ -363,6 +523,9 @@ class DatabaseManager:
             session.close()
 
     async def get_obj_column_value(self, obj: Account | Route | RouteAction, column: str):
+        return await self.run(self._get_obj_column_value, obj, column)
+
+    def _get_obj_column_value(self, obj: Account | Route | RouteAction, column: str):
         session = self.Session()
         try:
             # Получаем свежую версию объекта из базы
@@ -391,6 +554,38 @@ class DatabaseManager:
     def get_account_by_id(self, account_id: int) -> Account | None:
         return self.one(Account, Account.id == account_id)
 
+    @staticmethod
+    def run_snapshot_stmt(rerun_failed: bool = False):
+        """Запрос аккаунтов для запуска, id аккаунтов выбираются по индексам статусов routes и route_actions"""
+        if rerun_failed:
+            account_ids = select(Route.account_id).join(RouteAction, RouteAction.route_id == Route.id).where(
+                RouteAction.status == RouteStatus.FAILED)
+        else:
+            account_ids = select(Route.account_id).where(
+                Route.status.in_([RouteStatus.PENDING, RouteStatus.IN_PROGRESS]))
+        return select(Account).where(Account.id.in_(account_ids)).order_by(Account.id)
+
+    def load_run_snapshot(self, rerun_failed: bool = False) -> list[AccountRecord]:
+        """
+        Loads accounts for the run with their routes, actions and params as detached records.
+
+        Accounts are selected by one query, routes, actions and params are loaded by a few set-based
+        selectin queries, so the workers don't query or merge anything.
+
+        :param rerun_failed: load accounts with failed actions instead of pending/in-progress routes
+        :return list[AccountRecord]: the accounts ordered by id
+        """
+        session = self.ReadSession()
+        try:
+            accounts = session.scalars(
+                self.run_snapshot_stmt(rerun_failed).options(
+                    selectinload(Account.route).selectinload(Route.actions).selectinload(RouteAction.params)
+                )
+            ).all()
+            return to_records(accounts)
+        finally:
+            session.close()
+
     def get_spare_proxy(self):
         return self.one(SpareProxy, SpareProxy.is_used == False)
 
@@ -423,7 +618,7 @@ class DatabaseManager:
         :param criterion: criterion for rows filtering
         :return list: the list of rows
         """
-        session = self.Session()
+        session = self.ReadSession()
 
         if stmt is not None:
             return list(session.scalars(stmt).all())
@@ -466,9 +661,9 @@ class DatabaseManager:
         :param query: the query
         :param args: any additional arguments
         """
-        result = self.conn.execute(text(query), *args)
-        self.commit()
-        return result
+        with self.engine.begin() as conn:
+            # результат буферизуется, чтобы сразу вернуть соединение писателя
+            return conn.execute(text(query), *args).freeze()()
 
     def commit(self):
         """
@@ -539,42 +734,43 @@ class DatabaseManager:
         session.delete(row)
         session.commit()
 
-    def get_free_proxy(self) -> str | None:
-        """Получает свободный прокси из запасных"""
-        session = self.Session()
+    @staticmethod
+    def spare_proxies_stmt():
+        return select(SpareProxy.proxy).order_by(SpareProxy.id)
+
+    @staticmethod
+    def proxy_in_use_stmt(proxy_str: str, in_use: bool):
+        return update(SpareProxy).where(SpareProxy.proxy == proxy_str).values(in_use=in_use, updated_at=datetime.now())
+
+    def get_spare_proxies(self) -> list[str]:
+        """Получает все запасные прокси"""
+        session = self.ReadSession()
         try:
-            proxy = session.query(SpareProxy).filter_by(in_use=False).first()
-            if proxy:
-                proxy.in_use = True
-                session.commit()
-                return proxy.proxy
-            return None
+            return list(session.scalars(self.spare_proxies_stmt()))
         finally:
             session.close()
 
-    def reset_proxies(self):
+    def set_proxy_in_use(self, proxy_str: str, in_use: bool) -> None:
+        """Сохраняет состояние прокси из пула"""
         session = self.Session()
         try:
-            # Update all SpareProxy records to set in_use=False
-            session.query(SpareProxy).update({SpareProxy.in_use: False})
+            session.execute(self.proxy_in_use_stmt(proxy_str, in_use))
             session.commit()
-            self.logger.info("Reset all SpareProxy records to in_use=False")
         finally:
             session.close()
 
-    def release_proxy(self, proxy_str: str) -> None:
-        """Освобождает прокси"""
+    def reset_proxies(self):
         session = self.Session()
         try:
-            proxy = session.query(SpareProxy).filter_by(proxy=proxy_str).first()
-            if proxy:
-                proxy.in_use = False
-                session.commit()
+            # Update all SpareProxy records to set in_use=False
+            session.query(SpareProxy).update({SpareProxy.in_use: False})
+            session.commit()
+            self.logger.info("Reset all SpareProxy records to in_use=False")
         finally:
             session.close()
 
     def get_action_params(self):
-        session = self.Session()
+        session = self.ReadSession()
         try:
             action_params = session.query(ActionParams).first()
             if action_params:
@@ -588,3 +784,4 @@ db = DatabaseManager()
 if __name__ == "__main__":
     obj = db.execute(f"SELECT created_at FROM Routes WHERE account_id == 1")
     print(f"obj: {obj.scalar()}")
+    db.check_query_plans()
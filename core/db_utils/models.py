@@ -1,6 +1,6 @@
 import json
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import declarative_base, relationship, Mapped, mapped_column
 from datetime import datetime
 import enum
@@ -39,6 +39,9 @@ class Account(Base):
     email_address: Mapped[str] = mapped_column(nullable=True)
     email_password: Mapped[str] = mapped_column(nullable=True)
 
+    # хэш строки таблицы, по которому импорт пропускает неизмененные аккаунты
+    row_hash: Mapped[str | None] = mapped_column(nullable=True)
+
     created_at: Mapped[datetime] = mapped_column(default=datetime.now(), nullable=False)
     updated_at: Mapped[datetime | None] = mapped_column(nullable=True)
 
@@ -65,6 +68,11 @@ class SpareProxy(Base):
 
 class Route(Base):
     __tablename__ = 'routes'
+    __table_args__ = (
+        # фильтр по статусу с сортировкой по аккаунту (launch, пагинация и подсчет в CLI)
+        Index('ix_routes_status_account_id', 'status', 'account_id'),
+        Index('ix_routes_account_id', 'account_id'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     status: Mapped[RouteStatus] = mapped_column(default=RouteStatus.PENDING, nullable=False)
@@ -72,6 +80,8 @@ class Route(Base):
     started_at: Mapped[datetime | None] = mapped_column(nullable=True)
     completed_at: Mapped[datetime | None] = mapped_column(nullable=True)
     updated_at: Mapped[datetime | None] = mapped_column(nullable=True)
+    # хэш пресета, из которого создан маршрут
+    preset_hash: Mapped[str | None] = mapped_column(nullable=True)
 
     # Связь many-to-many с Account
     account = relationship('Account', back_populates='route')
@@ -88,6 +98,12 @@ class Route(Base):
 
 class RouteAction(Base):
     __tablename__ = 'route_actions'
+    __table_args__ = (
+        # загрузка действий маршрута в порядке выполнения
+        Index('ix_route_actions_route_id_order_index', 'route_id', 'order_index'),
+        # перезапуск неудачных действий
+        Index('ix_route_actions_status_route_id', 'status', 'route_id'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     action_name: Mapped[str] = mapped_column(nullable=True)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+
+from core.db_utils.db import DatabaseManager, db
+from core.init_settings import settings
+from core.logger import get_logger
+from utils.utils import excname
+
+
+@dataclass
+class _ProxyState:
+    proxy: str
+    owner: str | None = None
+    last_used: float = 0
+    failures: int = 0
+    cooldown_until: float = 0
+
+
+class ProxyPool:
+    """
+    In-process pool of the spare proxies from SpareProxy.
+
+    A proxy is leased by one owner (an account) at a time and is free again only when the owner releases it.
+    The least recently used free proxy is leased first. A proxy released as failed goes to a cooldown that grows with
+    every failure in a row (settings.general.proxy_cooldown up to settings.general.proxy_cooldown_max seconds).
+    SpareProxy.in_use is written in the background through the database thread.
+
+    Usage:
+        proxy = await proxy_pool.acquire(account.name)
+        ...
+        await proxy_pool.release(proxy, account.name, failed=True)
+    """
+    def __init__(self, db_manager: DatabaseManager) -> None:
+        self.db = db_manager
+        self.logger = get_logger(class_name=self.__class__.__name__)
+        self._proxies: dict[str, _ProxyState] | None = None
+        self._lock = asyncio.Lock()
+        self._persist_tasks: set[asyncio.Task] = set()
+
+    async def _load(self) -> dict[str, _ProxyState]:
+        if self._proxies is None:
+            proxies = await self.db.run(self.db.get_spare_proxies)
+            # аренды прошлого запуска не действуют, все прокси свободны
+            self._proxies = {proxy: _ProxyState(proxy) for proxy in proxies}
+            self._persist_all_free()
+            self.logger.debug(f"Loaded {len(self._proxies)} spare proxies")
+        return self._proxies
+
+    def _persist(self, proxy: str, in_use: bool) -> None:
+        task = asyncio.create_task(self.db.run(self.db.set_proxy_in_use, proxy, in_use))
+        self._persist_tasks.add(task)
+        task.add_done_callback(self._persisted)
+
+    def _persist_all_free(self) -> None:
+        task = asyncio.create_task(self.db.run(self.db.reset_proxies))
+        self._persist_tasks.add(task)
+        task.add_done_callback(self._persisted)
+
+    def _persisted(self, task: asyncio.Task) -> None:
+        self._persist_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            self.logger.warning(f"Failed to save proxy state: {excname(task.exception())} {task.exception()}")
+
+    def invalidate(self) -> None:
+        """Перечитать прокси из базы при следующем acquire, вызывается после синхронизации с таблицей"""
+        self._proxies = None
+
+    async def acquire(self, owner: str) -> str | None:
+        """
+        Lease the least recently used free proxy, waits if all free proxies are cooling down.
+
+        :param str owner: the owner of the lease.
+        :return str | None: the proxy or None if all proxies are leased.
+        """
+        while True:
+            async with self._lock:
+                proxies = await self._load()
+                now = time.monotonic()
+                free = [state for state in proxies.values() if state.owner is None]
+                ready = [state for state in free if state.cooldown_until <= now]
+                if ready:
+                    state = min(ready, key=lambda state_: state_.last_used)
+                    state.owner = owner
+                    state.last_used = now
+                    self._persist(state.proxy, True)
+                    return state.proxy
+
+                if not free:
+                    return None
+
+                wait = min(state.cooldown_until for state in free) - now
+
+            self.logger.info(f"All free proxies are cooling down, waiting {wait:.0f} seconds")
+            await asyncio.sleep(wait)
+
+    async def release(self, proxy: str, owner: str, failed: bool = False) -> None:
+        """
+        Return the leased proxy to the pool.
+
+        :param str proxy: the proxy.
+        :param str owner: the owner of the lease, leases of other owners are not released.
+        :param bool failed: the proxy failed and has to cool down.
+        """
+        async with self._lock:
+            state = (await self._load()).get(proxy)
+            if not state or state.owner != owner:
+                return
+
+            state.owner = None
+            if failed:
+                state.failures += 1
+                cooldown = min(settings.general.proxy_cooldown * 2 ** (state.failures - 1),
+                               settings.general.proxy_cooldown_max)
+                state.cooldown_until = time.monotonic() + cooldown
+            else:
+                state.failures = 0
+            self._persist(proxy, False)
+
+
+proxy_pool = ProxyPool(db)
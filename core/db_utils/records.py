@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import ClassVar
+
+from core.db_utils.models import Account, Route, RouteAction, ActionParams, RouteStatus
+
+
+# Отвязанные от сессии копии моделей для одного запуска. Имена полей совпадают с колонками моделей,
+# а model указывает таблицу, в которую пишет StatusBuffer
+
+
+@dataclass(slots=True, eq=False)
+class ActionParamsRecord:
+    model: ClassVar[type] = ActionParams
+
+    id: int
+    action_params: str | None
+
+
+@dataclass(slots=True, eq=False)
+class RouteActionRecord:
+    model: ClassVar[type] = RouteAction
+
+    id: int
+    route_id: int
+    action_type: str
+    action_name: str | None
+    params_id: int
+    status: RouteStatus
+    order_index: int
+    started_at: datetime | None
+    completed_at: datetime | None
+    updated_at: datetime | None
+    params: ActionParamsRecord | None
+
+    def __str__(self):
+        return f"RouteAction: {self.action_name}"
+
+
+@dataclass(slots=True, eq=False)
+class RouteRecord:
+    model: ClassVar[type] = Route
+
+    id: int
+    account_id: int
+    status: RouteStatus
+    started_at: datetime | None
+    completed_at: datetime | None
+    updated_at: datetime | None
+    actions: list[RouteActionRecord] = field(default_factory=list)
+
+
+@dataclass(slots=True, eq=False, repr=False)
+class AccountRecord:
+    model: ClassVar[type] = Account
+
+    id: int
+    name: str
+    proxy: str | None
+    user_agent: str | None
+    os_user_agent: str | None
+    chrome_version: str | None
+    evm_private_key: str | None
+    evm_address: str | None
+    aptos_private_key: str | None
+    aptos_address: str | None
+    solana_private_key: str | None
+    solana_address: str | None
+    twitter_token: str | None
+    ct0: str | None
+    discord_token: str | None
+    email_address: str | None
+    email_password: str | None
+    updated_at: datetime | None
+    route: RouteRecord | None
+
+    def __repr__(self):
+        return f"Name: {self.name}, EVM address: {self.evm_address}"
+
+
+def _columns(obj, record_cls) -> dict:
+    return {field_.name: getattr(obj, field_.name) for field_ in fields(record_cls)
+            if field_.name not in ("params", "actions", "route")}
+
+
+def to_records(accounts: list[Account]) -> list[AccountRecord]:
+    """
+    Copies loaded accounts with their routes, actions and params to detached records.
+
+    :param accounts: accounts with route, route.actions and action.params already loaded
+    :return list[AccountRecord]: records in the same order
+    """
+    params_records: dict[int, ActionParamsRecord] = {}
+    records = []
+    for account in accounts:
+        route_record = None
+        if account.route:
+            actions = []
+            for action in account.route.actions:
+                params_record = None
+                if action.params:
+                    params_record = params_records.setdefault(
+                        action.params.id, ActionParamsRecord(**_columns(action.params, ActionParamsRecord)))
+                actions.append(RouteActionRecord(**_columns(action, RouteActionRecord), params=params_record))
+            route_record = RouteRecord(**_columns(account.route, RouteRecord), actions=actions)
+
+        records.append(AccountRecord(**_columns(account, AccountRecord), route=route_record))
+    return records
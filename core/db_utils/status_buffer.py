@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import update
+
+from core.db_utils.db import DatabaseManager, db
+from core.db_utils.models import Route, RouteAction
+from core.db_utils.records import RouteRecord, RouteActionRecord
+from core.init_settings import settings
+from core.logger import get_logger
+from utils.utils import excname
+
+
+class StatusBuffer:
+    """
+    Write-behind buffer for status, started_at and completed_at of routes and actions.
+
+    Updates are applied to the object in memory right away and coalesced per (model, id), so several updates
+    of one object become a single UPDATE. Pending updates are written in one transaction every
+    settings.database.status_flush_interval_ms milliseconds or after settings.database.status_flush_max_updates
+    updates, whichever comes first, in the database thread. close() must be awaited at shutdown, flush() is
+    registered with atexit for the updates left after the event loop is gone.
+
+    Usage:
+        await status_buffer.update(action, status=RouteStatus.IN_PROGRESS, started_at=datetime.now())
+        ...
+        await status_buffer.close()
+    """
+    def __init__(self, db_manager: DatabaseManager) -> None:
+        self.db = db_manager
+        self.logger = get_logger(class_name=self.__class__.__name__)
+        # (model, id) -> column -> (номер обновления, значение)
+        self._pending: dict[tuple[type, int], dict[str, tuple[int, Any]]] = {}
+        # (model, id) -> column -> номер последнего записанного в базу обновления
+        self._written: dict[tuple[type, int], dict[str, int]] = {}
+        self._seq = 0
+        self._updates = 0
+        self._flusher: asyncio.Task | None = None
+        atexit.register(self.flush)
+
+    async def update(self, obj: Route | RouteAction | RouteRecord | RouteActionRecord, **values) -> None:
+        """
+        Set the columns of the object and schedule the write.
+
+        :param obj: the route or action, a model or its record.
+        :param values: column names and their new values.
+        """
+        for attribute, value in values.items():
+            if not hasattr(obj, attribute):
+                self.logger.critical(f"No {attribute} attribute in {obj}")
+                return
+            setattr(obj, attribute, value)
+
+        obj.updated_at = datetime.now()
+        model = getattr(obj, "model", type(obj))
+        self._seq += 1
+        pending = self._pending.setdefault((model, obj.id), {})
+        for column, value in (values | {"updated_at": obj.updated_at}).items():
+            pending[column] = (self._seq, value)
+        self._updates += 1
+
+        if self._updates >= settings.database.status_flush_max_updates:
+            await self._flush()
+        elif self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(settings.database.status_flush_interval_ms / 1000)
+        await self._flush()
+
+    def _take(self) -> tuple[dict[tuple[type, int], dict[str, tuple[int, Any]]], int]:
+        pending, self._pending = self._pending, {}
+        updates, self._updates = self._updates, 0
+        return pending, updates
+
+    def _restore(self, pending: dict[tuple[type, int], dict[str, tuple[int, Any]]], updates: int) -> None:
+        # пачки пишутся по очереди, поэтому неудачная старая пачка может вернуться после записи более новой:
+        # возвращаются только значения, новее которых нет ни в буфере, ни в базе
+        for key, values in pending.items():
+            written = self._written.get(key, {})
+            buffered = self._pending.get(key, {})
+            restored = {column: (seq, value) for column, (seq, value) in values.items()
+                        if seq > written.get(column, 0) and seq > buffered.get(column, (0, None))[0]}
+            if restored:
+                self._pending[key] = buffered | restored
+        self._updates += updates
+
+    def _write(self, pending: dict[tuple[type, int], dict[str, tuple[int, Any]]]) -> bool:
+        session = self.db.Session()
+        try:
+            for (model, obj_id), values in pending.items():
+                written = self._written.get((model, obj_id), {})
+                columns = {column: value for column, (seq, value) in values.items()
+                           if seq > written.get(column, 0)}
+                if columns:
+                    session.execute(update(model).where(model.id == obj_id).values(**columns))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            self.logger.error(f"{excname(e)} Failed to flush {len(pending)} status updates: {e}")
+            return False
+        finally:
+            session.close()
+
+        for key, values in pending.items():
+            written = self._written.setdefault(key, {})
+            for column, (seq, _) in values.items():
+                written[column] = max(seq, written.get(column, 0))
+        return True
+
+    async def _flush(self) -> None:
+        # буфер забирается в event loop, а пишется в потоке базы
+        pending, updates = self._take()
+        if not pending:
+            return
+        write = asyncio.ensure_future(self.db.run(self._write, pending))
+        try:
+            written = await asyncio.shield(write)
+        except asyncio.CancelledError:
+            # запись уже идет в потоке базы, ее результат нужен, чтобы не потерять пачку
+            if not await write:
+                self._restore(pending, updates)
+            raise
+        if not written:
+            self._restore(pending, updates)
+
+    async def close(self) -> None:
+        """
+        Cancel the scheduled flush and write all pending updates, called at shutdown from the event loop.
+        """
+        if self._flusher and not self._flusher.done():
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+        self._flusher = None
+        await self._flush()
+
+    def flush(self) -> None:
+        """
+        Write all pending updates in one transaction, blocks until they are written.
+        """
+        pending, updates = self._take()
+        if pending and not self._write(pending):
+            self._restore(pending, updates)
+
+status_buffer = StatusBuffer(db)
@@ -1,3 +1,5 @@
+import importlib.util
+
 import pandas as pd
 from pathlib import Path
 from dataclasses import dataclass
@@ -54,16 +56,7 @@ class AccountData:
         self.os_user_agent = os_ua
         self.chrome_version = chrome_version
 
-        if self.evm_private_key:
-            eth_client = EthClient(private_key=self.evm_private_key)
-            self.evm_address = eth_client.w3_account.address
-
-        if self.aptos_private_key:
-            aptos_client = AptosClient(None, self.aptos_private_key)
-            self.aptos_address = aptos_client.address
-
-        if self.solana_private_key:
-            self.solana_address = str(Keypair.from_base58_string(self.solana_private_key))
+        # адреса вычисляются пачками через address_deriver.fill
 
 
 class ExcelManager:
@@ -72,102 +65,108 @@ class ExcelManager:
         self.spare_proxies: set[str] = set()  # Множество запасных прокси
         self.logger = get_logger(class_name=self.__class__.__name__)
 
-    def load_accounts(self,
-                      socials_only: bool = False,
-                      excel_path: str = "accounts_data.xlsx",
-                      sheet_name: str = "Main",
-                      name_column: str = "Name",
-                      on_off_column: str = "ON/OFF",
-                      evm_private_key_column: str = "EVM Private key",
-                      aptos_private_key_column: str = "Aptos Private key",
-                      solana_private_key_column: str = "Solana Private key",
-                      proxy_column: str = "Proxy",
-                      twitter_token_column: str = "Twitter Token",
-                      ct0_column: str = "ct0",
-                      discord_token_column: str = "DiscordClient Token",
-                      email_address_column: str = "Email Address",
-                      email_password_column: str = "Email Password",
-                      ) -> tuple[list[AccountData], list[str]]:
+    def load_rows(self,
+                  socials_only: bool = False,
+                  excel_path: str = "accounts_data.xlsx",
+                  sheet_name: str = "Main",
+                  name_column: str = "Name",
+                  on_off_column: str = "ON/OFF",
+                  evm_private_key_column: str = "EVM Private key",
+                  aptos_private_key_column: str = "Aptos Private key",
+                  solana_private_key_column: str = "Solana Private key",
+                  proxy_column: str = "Proxy",
+                  twitter_token_column: str = "Twitter Token",
+                  ct0_column: str = "ct0",
+                  discord_token_column: str = "DiscordClient Token",
+                  email_address_column: str = "Email Address",
+                  email_password_column: str = "Email Password",
+                  ) -> tuple[list[dict], list[str]]:
+        """
+        Читает строки включенных аккаунтов как аргументы AccountData, без вычисления адресов и user agent
+
+        :return: строки и запасные прокси
+        """
         try:
             excel_path = Path(excel_path)
             if not excel_path.exists():
                 raise FileNotFoundError(f"Excel file not found: {excel_path}")
 
-            # Читаем Excel файл
-            df = pd.read_excel(excel_path, sheet_name=sheet_name, dtype=str)
-            
+            df = self.read_table(excel_path, sheet_name)
+
             required_columns = [name_column, on_off_column, evm_private_key_column, proxy_column]
 
             missing_columns = [col for col in required_columns if col not in df.columns]
             if missing_columns:
                 raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
-            
-            accounts = []
-            used_proxies = set()
-            all_proxies = set()
-
-            if proxy_column in df.columns:
-                all_proxies = {
-                    Proxy.from_str(proxy.strip()).as_url
-                    for proxy in df[proxy_column].dropna() 
-                    if proxy.strip()
-                }
-            
-            for _, row in df.iterrows():
-                if not socials_only:
-                    # Пропускаем строки без имени или приватного ключа
-                    if pd.isna(row[name_column]) or pd.isna(row[evm_private_key_column]):
-                        continue
-                else:
-                    if pd.isna(row[name_column]):
-                        continue
-
-                if str(row[on_off_column]) != "ON" and str(row[on_off_column]) != "OFF":
-                    raise Exception(f"Wrong value in ON/OFF column: {row[on_off_column]}, {row[evm_private_key_column]}")
-
-                if str(row[on_off_column]) == "OFF":
-                    if settings.logging.debug_logging:
-                        self.logger.debug(f"Skipping row {row[evm_private_key_column]}")
-                    continue
-
-                try:
-                    proxy = row.get(proxy_column) if proxy_column in df.columns else None
-                    if pd.notna(proxy):
-                        proxy = Proxy.from_str(proxy.strip()).as_url
-                        used_proxies.add(proxy)
-
-                    twitter_token = row.get(twitter_token_column) if twitter_token_column in df.columns else None
-                    ct0 = row.get(ct0_column) if ct0_column in df.columns else None
-                    discord_token = row.get(discord_token_column) if discord_token_column in df.columns else None
-                    email_address = row.get(email_address_column) if email_address_column in df.columns else None
-                    email_password = row.get(email_password_column) if email_password_column in df.columns else None
-
-                    account = AccountData(
-                        name=row[name_column],
-                        evm_private_key=row[evm_private_key_column] if pd.notna(row[evm_private_key_column]) else None,
-                        aptos_private_key=row[aptos_private_key_column] if pd.notna(row[aptos_private_key_column]) else None,
-                        solana_private_key=row[solana_private_key_column] if pd.notna(row[solana_private_key_column]) else None,
-                        proxy=proxy if pd.notna(proxy) else None,
-                        twitter_token=twitter_token if pd.notna(twitter_token) else None,
-                        ct0=ct0 if pd.notna(ct0) else None,
-                        discord_token=discord_token if pd.notna(discord_token) else None,
-                        email_address=email_address if pd.notna(email_address) else None,
-                        email_password=email_password if pd.notna(email_password) else None,
-                    )
-
-                    accounts.append(account)
-                except Exception as e:
-                    self.logger.exception(f"{excname(e)}. Error processing row {row[name_column]}: {str(e)}")
-                    raise e
-            
+
+            # Прокси нормализуются один раз на уникальное значение
+            proxies = df[proxy_column]
+            proxy_urls = {proxy: Proxy.from_str(proxy).as_url for proxy in proxies.dropna().unique()}
+            proxies = proxies.map(proxy_urls)
+            all_proxies = set(proxies.dropna())
+
+            # Пропускаем строки без имени или приватного ключа
+            present = df[name_column].notna()
+            if not socials_only:
+                present &= df[evm_private_key_column].notna()
+            df, proxies = df[present], proxies[present]
+
+            on_off = df[on_off_column].fillna("")
+            wrong = ~on_off.isin(["ON", "OFF"])
+            if wrong.any():
+                row = df[wrong].iloc[0]
+                raise Exception(f"Wrong value in ON/OFF column: {row[on_off_column]}, {row[evm_private_key_column]}")
+
+            enabled = on_off == "ON"
+            if settings.logging.debug_logging:
+                for private_key in df.loc[~enabled, evm_private_key_column]:
+                    self.logger.debug(f"Skipping row {private_key}")
+            df, proxies = df[enabled], proxies[enabled]
+
+            columns = {
+                "name": name_column,
+                "evm_private_key": evm_private_key_column,
+                "aptos_private_key": aptos_private_key_column,
+                "solana_private_key": solana_private_key_column,
+                "twitter_token": twitter_token_column,
+                "ct0": ct0_column,
+                "discord_token": discord_token_column,
+                "email_address": email_address_column,
+                "email_password": email_password_column,
+            }
+            records = pd.DataFrame({field_: df[column] if column in df.columns else None
+                                    for field_, column in columns.items()}, index=df.index)
+            records["proxy"] = proxies
+            records = records.astype(object).where(records.notna(), None)
+            rows = records.to_dict("records")
+
             # Находим неиспользованные прокси
-            self.spare_proxies = all_proxies - used_proxies
-            
-            self.logger.info(f"Successfully loaded {len(accounts)} accounts from {excel_path}")
+            self.spare_proxies = all_proxies - set(proxies.dropna())
+
+            self.logger.info(f"Successfully loaded {len(rows)} accounts from {excel_path}")
             self.logger.info(f"Found {len(self.spare_proxies)} spare proxies")
-            
-            return accounts, list(self.spare_proxies)
-            
+
+            return rows, list(self.spare_proxies)
+
         except Exception as e:
             self.logger.error(f"{excname(e)}. Error loading Excel file {excel_path}: {str(e)}")
             raise
+
+    @staticmethod
+    def read_table(path: Path, sheet_name: str) -> pd.DataFrame:
+        """
+        Читает таблицу аккаунтов как строки: .csv и .parquet по расширению файла, иначе Excel.
+        Для Excel используется движок calamine, если установлен python-calamine (намного быстрее openpyxl)
+        """
+        suffix = path.suffix.lower()
+        if suffix == ".csv":
+            df = pd.read_csv(path, dtype=str)
+        elif suffix == ".parquet":
+            df = pd.read_parquet(path)
+        else:
+            engine = "calamine" if importlib.util.find_spec("python_calamine") else None
+            df = pd.read_excel(path, sheet_name=sheet_name, dtype=str, engine=engine)
+
+        # пустые после удаления пробелов ячейки считаются пустыми
+        df = df.astype("string").apply(lambda column: column.str.strip())
+        return df.replace("", pd.NA)
@@ -1,7 +1,7 @@
 import curl_cffi
 from curl_cffi.requests import AsyncSession
 
-from core.db_utils.models import Account
+from core.db_utils.records import AccountRecord
 from core.logger import get_logger
 from core.init_settings import settings
 from utils.utils import excname
@@ -34,7 +34,7 @@ class Notificator:
                 await session.close()
 
 
-    async def send_notification_for_done_account(self, account: Account, actions_dict: dict[str, list],
+    async def send_notification_for_done_account(self, account: AccountRecord, actions_dict: dict[str, list],
                                                  completed_accounts: int, log_context):
         try:
             self.logger = get_logger(class_name=self.__class__.__name__, **log_context)
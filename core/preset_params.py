@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from libs.blockchains.eth_async.data.models import Networks
+
+
+SWAP_MODES = ("only_to", "to_and_from")
+
+
+@dataclass(frozen=True, slots=True)
+class SwapSpec:
+    from_token: str
+    to_token: str
+    swap_mode: str
+    amount: tuple[float, float] | tuple[str, str]
+    slippage: float
+
+
+@dataclass(frozen=True, slots=True)
+class BridgeSpec:
+    to_network: str
+    from_token: str
+    to_token: str
+    amount: tuple[float, float] | tuple[str, str]
+    slippage: float
+
+
+@dataclass(frozen=True, slots=True)
+class PresetParams:
+    """Parsed functions_params of a preset: specs per action kind ("swap", "bridge") and network"""
+    swap: dict[str, list[SwapSpec]] = field(default_factory=dict)
+    bridge: dict[str, list[BridgeSpec]] = field(default_factory=dict)
+
+    def specs(self, action_type: str) -> list[SwapSpec] | list[BridgeSpec]:
+        """
+        Returns the specs of the action.
+
+        :param str action_type: the action type like "jumper_swap_unichain"
+        :return: the specs for the network of the action
+        """
+        action_type = action_type.lower()
+        parts = action_type.split("_")
+        kind, network = (parts[1], parts[-1]) if len(parts) > 2 else (None, None)
+        specs = getattr(self, kind) if kind in ("swap", "bridge") else None
+        if specs is None:
+            raise ValueError(f"Unknown action type {action_type}")
+        if not specs.get(network):
+            raise ValueError(f"No functions_params.{kind}.{network} for action {action_type}")
+        return specs[network]
+
+
+def _parse_amount(amount, where: str) -> tuple[float, float] | tuple[str, str]:
+    if not isinstance(amount, list) or len(amount) != 2:
+        raise ValueError(f"{where}: amount must be a list of two values, got {amount}")
+
+    if all(isinstance(value, str) for value in amount):
+        try:
+            low, high = int(amount[0]), int(amount[1])
+        except ValueError:
+            raise ValueError(f"{where}: percentage amount must be integers in quotes, got {amount}")
+        if low < 0 or high > 100 or low > high:
+            raise ValueError(f"{where}: incorrect percentage {amount}")
+        return amount[0], amount[1]
+
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in amount):
+        if amount[0] < 0 or amount[0] > amount[1]:
+            raise ValueError(f"{where}: incorrect amount {amount}")
+        return float(amount[0]), float(amount[1])
+
+    raise ValueError(f"{where}: amount must be two numbers or two percentages in quotes, got {amount}")
+
+
+def _get(entry: dict, key: str, types: type | tuple[type, ...], where: str):
+    if key not in entry:
+        raise ValueError(f"{where}: missing {key}")
+    value = entry[key]
+    if not isinstance(value, types) or isinstance(value, bool):
+        raise ValueError(f"{where}: wrong {key} {value!r}")
+    return value
+
+
+def _parse_slippage(entry: dict, where: str) -> float:
+    slippage = float(_get(entry, "slippage", (int, float), where))
+    if not 0 < slippage < 100:
+        raise ValueError(f"{where}: slippage must be between 0 and 100 %, got {slippage}")
+    return slippage
+
+
+def _entries(functions_params: dict, kind: str) -> dict[str, list[dict]]:
+    networks = functions_params.get(kind) or {}
+    if not isinstance(networks, dict):
+        raise ValueError(f"functions_params.{kind} must be a table of networks, got {type(networks).__name__}")
+    for network, entries in networks.items():
+        where = f"functions_params.{kind}.{network}"
+        if not isinstance(entries, list):
+            raise ValueError(f"{where} must be an array of tables ([[{where}]]), got {type(entries).__name__}")
+        for num, entry in enumerate(entries, start=1):
+            if not isinstance(entry, dict):
+                raise ValueError(f"{where} #{num} must be a table, got {entry!r}")
+    return networks
+
+
+def compile_params(functions_params: dict | str) -> PresetParams:
+    """
+    Parses and validates functions_params of a preset.
+
+    :param functions_params: functions_params as a dict or its json from ActionParams
+    :return PresetParams: the typed specs
+    """
+    if isinstance(functions_params, str):
+        functions_params = json.loads(functions_params)  # JSONDecodeError - это ValueError
+    if not isinstance(functions_params, dict):
+        raise ValueError(f"functions_params must be a table, got {type(functions_params).__name__}")
+
+    swap, bridge = {}, {}
+    for network, entries in _entries(functions_params, "swap").items():
+        specs = []
+        for num, entry in enumerate(entries, start=1):
+            where = f"functions_params.swap.{network} #{num}"
+            swap_mode = _get(entry, "swap_mode", str, where)
+            if swap_mode not in SWAP_MODES:
+                raise ValueError(f"{where}: swap_mode must be one of {SWAP_MODES}, got {swap_mode}")
+            specs.append(SwapSpec(from_token=_get(entry, "from_token", str, where),
+                                  to_token=_get(entry, "to_token", str, where),
+                                  swap_mode=swap_mode,
+                                  amount=_parse_amount(entry.get("amount"), where),
+                                  slippage=_parse_slippage(entry, where)))
+        swap[network.lower()] = specs
+
+    for network, entries in _entries(functions_params, "bridge").items():
+        specs = []
+        for num, entry in enumerate(entries, start=1):
+            where = f"functions_params.bridge.{network} #{num}"
+            to_network = _get(entry, "to_network", str, where)
+            if not Networks.get_network_by_name(to_network):
+                raise ValueError(f"{where}: unknown network {to_network}")
+            specs.append(BridgeSpec(to_network=to_network,
+                                    from_token=_get(entry, "from_token", str, where),
+                                    to_token=_get(entry, "to_token", str, where),
+                                    amount=_parse_amount(entry.get("amount"), where),
+                                    slippage=_parse_slippage(entry, where)))
+        bridge[network.lower()] = specs
+
+    return PresetParams(swap=swap, bridge=bridge)
+
+
+def validate_preset(preset_data: dict) -> PresetParams:
+    """Проверяет параметры пресета и что они заданы для каждого действия из [functions]"""
+    for key in ("functions", "functions_params"):
+        if key not in preset_data:
+            raise ValueError(f"Preset has no [{key}]")
+    params = compile_params(preset_data["functions_params"])
+    for action_type in preset_data["functions"]:
+        params.specs(str(action_type))
+    return params
+
+
+class PresetParamsCache:
+    """
+    Compiled action params keyed by ActionParams.id, every params row is parsed and validated once per process.
+    invalidate() must be called when the params row is edited.
+    """
+    def __init__(self) -> None:
+        self._params: dict[int, PresetParams] = {}
+
+    def get(self, action_params) -> PresetParams:
+        """
+        :param action_params: ActionParams or its record, None gives empty params
+        """
+        if action_params is None:
+            return PresetParams()
+        if action_params.id not in self._params:
+            self._params[action_params.id] = compile_params(action_params.action_params)
+        return self._params[action_params.id]
+
+    def prepare(self, actions: Iterable) -> None:
+        """
+        Compiles params of all actions of the run, raises ValueError on the first bad preset.
+
+        :param actions: route actions with loaded params
+        """
+        for action in actions:
+            self.get(action.params).specs(action.action_type)
+
+    def invalidate(self, params_id: int | None = None) -> None:
+        if params_id is None:
+            self._params.clear()
+        else:
+            self._params.pop(params_id, None)
+
+
+preset_params_cache = PresetParamsCache()
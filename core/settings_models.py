@@ -205,6 +205,9 @@ class GeneralSettings:
     timeout: int = 30
     SHUFFLE_ACCOUNTS: bool = False
     SHUFFLE_ACTIONS: bool = False
+    simulate_transactions: bool = True
+    proxy_cooldown: float = 60
+    proxy_cooldown_max: float = 900
 
 
 @dataclass
@@ -213,10 +216,41 @@ class GasSettings:
     gas_chain_name: str = "Ethereum"
     maximum_gwei: float = 5
     gas_retry_delay: float = 30
+    gas_wake_spread: float = 10
     gas_price_multiplier: float = 1.2
     gas_limit_multiplier: float = 1.3
 
 
+@dataclass
+class JumperSettings:
+    route_cache: bool = False
+    route_cache_ttl: float = 60
+    route_cache_amount_bucket: float = 0.05
+    catalog_max_age: float = 86400
+    status_poll_base_delay: float = 2
+    status_poll_max_delay: float = 30
+    status_poll_timeout: float = 1800
+    analytics_queue_size: int = 100
+    analytics_retries: int = 3
+    analytics_retry_delay: float = 5
+    tools_blacklist: list[str] = field(default_factory=list)
+    route_duration_penalty: float = 0
+    route_fallbacks: int = 2
+    concurrent_swaps: bool = False
+
+
+@dataclass
+class DatabaseSettings:
+    status_flush_interval_ms: int = 500
+    status_flush_max_updates: int = 50
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = 268435456
+    cache_size: int = -65536
+    busy_timeout_ms: int = 5000
+    reader_pool_size: int = 5
+
+
 @dataclass
 class OKXSettings:
     api_key: str
@@ -273,6 +307,8 @@ class Settings(Singleton, AutoRepr):
     flow: FlowSettings
     delays: DelaysSettings
     gas: GasSettings
+    jumper: JumperSettings
+    database: DatabaseSettings
     cex: CEXSettings
     captcha: CaptchaSettings
     ai: AISettings
@@ -286,6 +322,8 @@ class Settings(Singleton, AutoRepr):
         flow = FlowSettings(**toml_data.get('flow', {}))
         delays = DelaysSettings(**toml_data.get('delays', {}))
         gas = GasSettings(**toml_data.get('gas', {}))
+        jumper = JumperSettings(**toml_data.get('jumper', {}))
+        database = DatabaseSettings(**toml_data.get('database', {}))
 
         cex_data = toml_data.get('CEX', {})
         okx = OKXSettings(**cex_data.get('okx', {}))
@@ -309,6 +347,8 @@ class Settings(Singleton, AutoRepr):
             flow=flow,
             delays=delays,
             gas=gas,
+            jumper=jumper,
+            database=database,
             cex=cex,
             captcha=captcha,
             ai=ai
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable
+
+from core.init_settings import settings
+from utils.utils import excname
+
+
+class AnalyticsQueue:
+    """
+    Bounded FIFO queue for Jumper analytics calls (/v1/wallets/transactions) that keeps them off the swap path.
+
+    A single worker sends the reports in the order they were submitted, so execution_completed never overtakes
+    execution_started of the same swap. Failed reports are retried, and drain() must be awaited before the
+    requests client of the account is closed.
+
+    Usage:
+        await queue.submit(lambda: jumper._create_or_finish_transaction(**data), "execution_started")
+        ...
+        await queue.drain()
+    """
+    def __init__(self, logger) -> None:
+        self.logger = logger
+        self._queue: asyncio.Queue[tuple[Callable[[], Awaitable[bool]], str]] = asyncio.Queue(
+            maxsize=settings.jumper.analytics_queue_size)
+        self._worker: asyncio.Task | None = None
+
+    async def submit(self, report: Callable[[], Awaitable[bool]], description: str) -> None:
+        """
+        Put the report to the queue, waits only if the queue is full.
+
+        :param report: a function returning the coroutine that sends the report and returns True on success.
+        :param str description: the name of the report for logs.
+        """
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._work())
+        await self._queue.put((report, description))
+
+    async def _send(self, report: Callable[[], Awaitable[bool]], description: str) -> None:
+        for attempt in range(1, settings.jumper.analytics_retries + 1):
+            try:
+                if await report():
+                    return
+                self.logger.warning(f"Jumper {description} report was not accepted, "
+                                    f"attempt {attempt}/{settings.jumper.analytics_retries}")
+            except Exception as e:
+                self.logger.warning(f"Jumper {description} report failed: {excname(e)} {str(e)}, "
+                                    f"attempt {attempt}/{settings.jumper.analytics_retries}")
+            await asyncio.sleep(settings.jumper.analytics_retry_delay)
+
+        self.logger.error(f"Jumper {description} report failed after {settings.jumper.analytics_retries} attempts")
+
+    async def _work(self) -> None:
+        while True:
+            report, description = await self._queue.get()
+            try:
+                await self._send(report, description)
+            finally:
+                self._queue.task_done()
+
+    async def drain(self) -> None:
+        """
+        Wait until all submitted reports are sent and stop the worker.
+        """
+        if self._worker is None:
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        self._worker = None
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import TYPE_CHECKING
+
+from core.config import AUXILIARY_DATA_DIR
+from core.init_settings import settings
+from core.logger import get_logger
+from utils.utils import read_json, write_json, excname
+
+if TYPE_CHECKING:
+    from libs.requests.web_requests import RequestsClient
+
+
+CATALOG_DIR = os.path.join(AUXILIARY_DATA_DIR, 'lifi_catalog')
+
+
+class LifiCatalog:
+    """
+    LI.FI chains and tokens catalogs stored on disk and shared by all accounts.
+
+    The catalogs are downloaded once and kept in core/auxiliary_data/lifi_catalog together with their ETag and
+    Last-Modified headers. A stale copy is revalidated on the next load with a conditional request through the
+    client of the loading account, so a 304 costs nothing but the request itself.
+
+    Usage:
+        await lifi_catalog.load(requests_client, headers)
+        token = lifi_catalog.token_by_symbol(8453, "USDC")
+    """
+    _urls = {
+        "chains": "https://api.jumper.exchange/p/lifi/chains",
+        "tokens": "https://api.jumper.exchange/p/lifi/tokens",
+    }
+    _params = {
+        'chainTypes': 'EVM,SVM,UTXO,MVM',
+    }
+
+    def __init__(self) -> None:
+        self.chains_data: dict | None = None
+        self.tokens_data: dict | None = None
+        self._meta: dict[str, dict] = {}
+        self._chains_by_id: dict[int, dict] = {}
+        self._tokens_by_address: dict[tuple[int, str], dict] = {}
+        self._tokens_by_symbol: dict[tuple[int, str], dict] = {}
+        self._lock = asyncio.Lock()
+        self.logger = get_logger(class_name=self.__class__.__name__)
+
+    @staticmethod
+    def _path(name: str) -> str:
+        return os.path.join(CATALOG_DIR, f"{name}.json")
+
+    def _read_disk(self, name: str) -> dict | None:
+        try:
+            return read_json(self._path(name), encoding='utf-8')
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, name: str, entry: dict) -> None:
+        os.makedirs(CATALOG_DIR, exist_ok=True)
+        write_json(self._path(name), entry, encoding='utf-8')
+
+    def _set(self, name: str, entry: dict) -> None:
+        self._meta[name] = {key: value for key, value in entry.items() if key != "body"}
+        setattr(self, f"{name}_data", entry["body"])
+        if name == "chains":
+            self._index_chains()
+        else:
+            self._index_tokens()
+
+    def _index_chains(self) -> None:
+        self._chains_by_id = {chain["id"]: chain for chain in self.chains_data.get("chains", [])}
+
+    def _index_tokens(self) -> None:
+        by_address, by_symbol = {}, {}
+        for chain_id, tokens in self.tokens_data.get("tokens", {}).items():
+            chain_id = int(chain_id)
+            for token in tokens:
+                by_address[(chain_id, token["address"].lower())] = token
+                # LI.FI lists the main token first if several share a symbol
+                by_symbol.setdefault((chain_id, token["symbol"].upper()), token)
+        self._tokens_by_address, self._tokens_by_symbol = by_address, by_symbol
+
+    def _is_stale(self, name: str) -> bool:
+        fetched_at = self._meta.get(name, {}).get("fetched_at", 0)
+        return time.time() - fetched_at > settings.jumper.catalog_max_age
+
+    async def _fetch(self, name: str, requests: RequestsClient, headers: dict) -> None:
+        meta = self._meta.get(name, {})
+        conditional_headers = dict(headers)
+        if meta.get("etag"):
+            conditional_headers["if-none-match"] = meta["etag"]
+        if meta.get("last_modified"):
+            conditional_headers["if-modified-since"] = meta["last_modified"]
+
+        response = await requests.get(self._urls[name], params=self._params,
+                                      additional_headers=conditional_headers, raw=True)
+
+        if response.status_code == 304 and getattr(self, f"{name}_data") is not None:
+            entry = {**meta, "fetched_at": time.time(), "body": getattr(self, f"{name}_data")}
+            self._meta[name] = {**meta, "fetched_at": entry["fetched_at"]}
+            self._write_disk(name, entry)
+            self.logger.debug(f"LI.FI {name} catalog is up to date")
+            return
+
+        if response.status_code != 200:
+            raise Exception(f"Failed to get LI.FI {name} catalog: {response.status_code} {response.text[:200]}")
+
+        entry = {
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "fetched_at": time.time(),
+            "body": response.json(),
+        }
+        self._set(name, entry)
+        self._write_disk(name, entry)
+        self.logger.debug(f"LI.FI {name} catalog downloaded")
+
+    async def load(self, requests: RequestsClient, headers: dict) -> None:
+        """
+        Make sure both catalogs are loaded, downloading them only if there is no copy on disk, and revalidate
+        the stale ones. A catalog that fails to revalidate is still used and revalidated on the next load.
+
+        :param RequestsClient requests: the requests client of the account.
+        :param dict headers: the headers for the LI.FI api.
+        """
+        if self.chains_data is None or self.tokens_data is None:
+            async with self._lock:
+                for name in self._urls:
+                    if getattr(self, f"{name}_data") is not None:
+                        continue
+                    entry = self._read_disk(name)
+                    if entry and "body" in entry:
+                        self._set(name, entry)
+                    else:
+                        await self._fetch(name, requests, headers)
+
+        if not any(self._is_stale(name) for name in self._urls):
+            return
+
+        async with self._lock:
+            # другой аккаунт мог обновить каталог, пока мы ждали блокировку
+            for name in self._urls:
+                if not self._is_stale(name):
+                    continue
+                try:
+                    await self._fetch(name, requests, headers)
+                except Exception as e:
+                    self.logger.warning(f"Failed to revalidate LI.FI {name} catalog: {excname(e)} {str(e)}")
+
+    def chain_by_id(self, chain_id: int) -> dict | None:
+        return self._chains_by_id.get(int(chain_id))
+
+    def token_by_address(self, chain_id: int, address: str) -> dict | None:
+        return self._tokens_by_address.get((int(chain_id), address.lower()))
+
+    def token_by_symbol(self, chain_id: int, symbol: str) -> dict | None:
+        return self._tokens_by_symbol.get((int(chain_id), symbol.upper()))
+
+
+lifi_catalog = LifiCatalog()
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from typing import Literal
 import uuid
@@ -11,9 +12,16 @@ from core.evm_contracts import EVMContracts
 from core.init_settings import settings
 from core.logger import get_logger
 from libs.blockchains.eth_async.base_evm_task_class import BaseEVMTaskClass
-from libs.blockchains.eth_async.data.models import RawContract, CommonValues, TxArgs
+from libs.blockchains.eth_async.applications.jumper_exchange.analytics_queue import AnalyticsQueue
+from libs.blockchains.eth_async.applications.jumper_exchange.catalog import lifi_catalog
+from libs.blockchains.eth_async.applications.jumper_exchange.permit_nonces import Permit2NonceTracker
+from libs.blockchains.eth_async.applications.jumper_exchange.route_cache import route_quote_cache
+from libs.blockchains.eth_async.applications.jumper_exchange.route_ranking import rank_routes
+from libs.blockchains.eth_async.applications.jumper_exchange.status_tracker import StatusTracker, LIFI_EXPLORER_TX
+from libs.blockchains.eth_async.data.models import RawContract, CommonValues, TxArgs, Networks
 from libs.blockchains.omnichain_models import TokenAmount
-from libs.blockchains.eth_async.exceptions import TxFailed
+from libs.blockchains.eth_async.exceptions import TxFailed, SimulationFailed
+from libs.blockchains.eth_async.receipt_logs import received_amount
 from libs.requests.exceptions import CustomRequestException, EXTERNAL_REQUEST_EXCEPTIONS
 from tasks.controller import Controller
 from utils.utils import log_sleep, excname
@@ -37,6 +45,8 @@ class JumperExchange(BaseEVMTaskClass["JumperExchange"]):
         super().__init__(self)
 
         self.session_id = self.generate_session_id()
+        self.status_tracker = StatusTracker(self)
+        self.analytics = AnalyticsQueue(self._logger)
 
     @staticmethod
     def generate_session_id():
@@ -66,9 +76,18 @@ class JumperExchange(BaseEVMTaskClass["JumperExchange"]):
                 "order": "CHEAPEST",
                 "slippage": slippage,
                 "maxPriceImpact": 0.4,
-                "allowSwitchChain": True,
+                # бридж должен быть одной транзакцией в исходной сети, остальное LI.FI доставит сам
+                "allowSwitchChain": from_chain_id == to_chain_id,
             },
         }
+        if settings.jumper.route_cache:
+            cache_key = route_quote_cache.key(from_chain_id, to_chain_id, from_token_address, to_token_address,
+                                              int(amount), slippage)
+            cached = route_quote_cache.get(cache_key, int(amount), self.eth_client.w3_account.address)
+            if cached:
+                self._logger.debug(f"Using cached routes for {from_token_address} to {to_token_address}")
+                return cached
+
         url = f"https://api.jumper.exchange/p/lifi/advanced/routes"
         def handler(response):
             if response.status_code != 200:
@@ -84,6 +103,9 @@ class JumperExchange(BaseEVMTaskClass["JumperExchange"]):
         available_routes = resp["routes"]
         unavailable_routes = resp["unavailableRoutes"] # filteredOut # failed
 
+        if settings.jumper.route_cache:
+            route_quote_cache.put(cache_key, int(amount), available_routes, unavailable_routes)
+
         return available_routes, unavailable_routes
 
     async def _create_or_finish_transaction(self, action: Literal["execution_start", "execution_completed"],
@@ -132,6 +154,11 @@ class JumperExchange(BaseEVMTaskClass["JumperExchange"]):
             return True
         return False
 
+    async def _report_transaction(self, transaction_data_dict: dict):
+        # отчеты Jumper отправляются в фоне по порядку, свап их не ждет
+        data = dict(transaction_data_dict)
+        await self.analytics.submit(lambda: self._create_or_finish_transaction(**data), data["action"])
+
     async def _swap_with_permit(self, tool_key, transaction_data_dict, from_token_address, best_output_route, slippage, token_from, from_amount,
                                 steps, chain_id, from_token_symbol):
         for _ in range(5):
@@ -167,33 +194,52 @@ class JumperExchange(BaseEVMTaskClass["JumperExchange"]):
                 # if "permit2" in data["domain"]["name"].lower():
                 # if "permit" in data["types"]["name"].lower():
                 approve_contract = data["message"]["spender"]
-                approve = await self.network_client.transactions.approve_interface(token_from,
-                                                                                   approve_contract,
-                                                                                   from_amount)
+
+                selected_step = steps[0]
+                for index, step in enumerate(steps):
+                    self._logger.info(f"step tool {index} {step['tool']}")
+                    if step["tool"] == tool_from_quote:
+                        selected_step = step
+
+                if selected_step["tool"] != tool_key:
+                    self._logger.warning(f"tool_key: {tool_key} != selected_step tool: {selected_step["tool"]}")
+                    # await log_sleep(self)
+                    # continue
+
+                assert transaction_data_dict["exchange"] == selected_step["tool"]
+
+                nonce_key = Permit2NonceTracker.key(chain_id, self.network_client.w3_account.address,
+                                                    data["domain"]["verifyingContract"])
+
+                async def read_permit_nonce():
+                    contract: AsyncContract = await self.network_client.contracts.get(
+                        contract=approve_contract, abi=EVMContracts.jumper_diamond_proxy_abi)
+                    return contract, await Permit2NonceTracker.reserve(nonce_key,
+                                                                       lambda: self._get_permit_nonce(contract))
+
+                # аппрув, nonce permit2 и данные свапа друг от друга не зависят
+                tasks = [
+                    asyncio.ensure_future(
+                        self.network_client.transactions.approve_interface(token_from, approve_contract, from_amount)),
+                    asyncio.ensure_future(read_permit_nonce()),
+                    asyncio.ensure_future(self._request_swap_data(selected_step)),
+                ]
+                try:
+                    approve, (contract, permit_nonce), step_transaction = await asyncio.gather(*tasks)
+                except BaseException:
+                    # при ошибке одного запроса остальные отменяются до перехода к следующему маршруту,
+                    # чтобы аппрув не ушел позже, а nonce сбрасывался после завершения reserve
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    Permit2NonceTracker.invalidate(nonce_key)
+                    raise
+
                 if approve:
+                    await self._report_transaction(transaction_data_dict)
                     # self._logger.debug(f"Signing data: {data}")
-                    selected_step = steps[0]
-                    for index, step in enumerate(steps):
-                        self._logger.info(f"step tool {index} {step['tool']}")
-                        if step["tool"] == tool_from_quote:
-                            selected_step = step
-
-                    if selected_step["tool"] != tool_key:
-                        self._logger.warning(f"tool_key: {tool_key} != selected_step tool: {selected_step["tool"]}")
-                        # await log_sleep(self)
-                        # continue
-
-                    assert transaction_data_dict["exchange"] == selected_step["tool"]
-                    if await self._create_or_finish_transaction(**transaction_data_dict):
-                        step_transaction = await self._request_swap_data(selected_step)
-                        _diamondCalldata1 = step_transaction["data"]
-                    else:
-                        await log_sleep(self)
-                        continue
-
-                    contract: AsyncContract = await self.network_client.contracts.get(contract=approve_contract,
-                                                                        abi=EVMContracts.jumper_diamond_proxy_abi)
-                    permit_nonce = await self._get_permit_nonce(contract)
+                    _diamondCalldata1 = step_transaction["data"]
+
                     structured_message = {
                             "domain": {
                                 "name": "Permit2",
@@ -274,15 +320,16 @@ class JumperExchange(BaseEVMTaskClass["JumperExchange"]):
                                   _signature=permit_signed.signature)
                     # self._logger.debug(f"My args: {args}")
 
-                    swap_data = contract.encode_abi("callDiamondWithPermit2", args.tuple())
+                    swap_data = self.network_client.contracts.encode_abi(contract, "callDiamondWithPermit2", args.tuple())
                     tx_params = TxParams(
                         to=contract.address,
                         data=swap_data,
                         # data=HexStr("0x0193b9fc00000000000000000000000000000000000000000000000000000000000000c0000000000000000000000000833589fcd6edb6e08f4c7c32d4f71b54bda0291300000000000000000000000000000000000000000000000000000000004c4b400000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000006846ffea00000000000000000000000000000000000000000000000000000000000006400000000000000000000000000000000000000000000000000000000000000544733214a35247e8e75301d0a3c6d35295fea3013c44a80817a515544a7dc7e6da954ad3de00000000000000000000000000000000000000000000000000000000000000c0000000000000000000000000000000000000000000000000000000000000010000000000000000000000000096f193844ebae791aa90d59bb9e12215d7b18bab0000000000000000000000000000000000000000000000000006f71b9a628e6c0000000000000000000000000000000000000000000000000000000000000160000000000000000000000000000000000000000000000000000000000000000f6a756d7065722e65786368616e67650000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000002a30783030303030303030303030303030303030303030303030303030303030303030303030303030303000000000000000000000000000000000000000000000000000000000000000000000ac4c6e212a361c968f1725b4d055b47e63f80b75000000000000000000000000ac4c6e212a361c968f1725b4d055b47e63f80b75000000000000000000000000833589fcd6edb6e08f4c7c32d4f71b54bda02913000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000004c4b4000000000000000000000000000000000000000000000000000000000000000e0000000000000000000000000000000000000000000000000000000000000000100000000000000000000000000000000000000000000000000000000000002c45f3bd1c8000000000000000000000000833589fcd6edb6e08f4c7c32d4f71b54bda0291300000000000000000000000000000000000000000000000000000000004c4b400000000000000000000000001231deb6f5749ef6ce6943a275a1d3e7486f4eae000000000000000000000000eeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee0000000000000000000000000000000000000000000000000006f71b9a628e6b0000000000000000000000003ced11c610556e5292fbc2e75d68c3899098c14c00000000000000000000000000000000000000000000000000000000000000e000000000000000000000000000000000000000000000000000000000000001a46be92b89000000000000000000000000833589fcd6edb6e08f4c7c32d4f71b54bda0291300000000000000000000000000000000000000000000000000000000004c4b40000000000000000000000000eeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee00000000000000000000000000000000000000000000000000070011734809590000000000000000000000001231deb6f5749ef6ce6943a275a1d3e7486f4eae000000000000000000000000000000000000000000000000000000000000010000000000000000000000000000000000000000000000000000000000000000010000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000007101833589fcd6edb6e08f4c7c32d4f71b54bda0291301ffff0172ab388e2e2f6facef59e3c3fa2c4e29011c2d38003ced11c610556e5292fbc2e75d68c3899098c14c0001420000000000000000000000000000000000000601ffff02003ced11c610556e5292fbc2e75d68c3899098c14c000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000004148b0fcdf25785b1be71eeea989ec456a0b970182c653e7cb91a991d71cc693415b1d63cc46c354df4e985cb7ba1a8953718ace87967f3415c0abe3effe3d86b21b00000000000000000000000000000000000000000000000000000000000000"),
                         value=0
                     )
-                    return tx_params
+                    return tx_params, nonce_key
 
+                Permit2NonceTracker.invalidate(nonce_key)
                 break
 
             except CustomRequestException as e:
@@ -304,6 +351,7 @@ class JumperExchange(BaseEVMTaskClass["JumperExchange"]):
                     token_from: RawContract | str,
                     token_to: RawContract | str,
                     slippage: float = 0.005, # 0.5 %
+                    to_chain_id: int | None = None,
                     ):
         str_amount = str(from_amount.Wei) if isinstance(from_amount, TokenAmount) else str(from_amount)
         if isinstance(token_from, RawContract):
@@ -312,22 +360,31 @@ class JumperExchange(BaseEVMTaskClass["JumperExchange"]):
             from_token_address = CommonValues.ZeroAddress \
                 if token_from.lower().strip() == "native" else Web3.to_checksum_address(token_from.strip())
 
-        if isinstance(token_from, RawContract):
+        if isinstance(token_to, RawContract):
             to_token_address = token_to.address
         else:
             to_token_address = CommonValues.ZeroAddress \
                 if token_to.lower().strip() == "native" else Web3.to_checksum_address(token_to.strip())
 
         chain_id = self.network_client.network.chain_id
+        to_chain_id = to_chain_id or chain_id
 
         for attempt in range(1, settings.general.number_of_retries + 1):
             try:
                 return await self._perform_swap(str_amount, from_token_address, to_token_address,
-                                                chain_id, slippage, token_from, token_to, from_amount)
+                                                chain_id, slippage, token_from, token_to, from_amount, to_chain_id)
 
             except TxFailed:
                 self._logger.error(f"Swap attempt {attempt}: tx failed")
 
+            except SimulationFailed as e:
+                # nothing was broadcast, next attempt gets a fresh quote
+                self._logger.error(f"Swap attempt {attempt}: {str(e)}, re-quoting")
+                if settings.jumper.route_cache:
+                    # иначе повторный запрос вернет те же маршруты из кэша
+                    route_quote_cache.invalidate(route_quote_cache.key(chain_id, to_chain_id, from_token_address,
+                                                                       to_token_address, int(str_amount), slippage))
+
             except CustomRequestException as e:
                 self._logger.error(f"Swap attempt {attempt}: CustomRequestException: {e.status_code}, {e.text}")
                 await log_sleep(self, settings.general.retry_delay)
@@ -340,28 +397,52 @@ class JumperExchange(BaseEVMTaskClass["JumperExchange"]):
                 self._logger.error(f"Swap attempt {attempt}: {excname(e)} {str(e)}")
 
 
+    async def bridge(self,
+                     from_amount: int | TokenAmount,
+                     token_from: RawContract | str,
+                     token_to: RawContract | str,
+                     to_network: str,
+                     slippage: float = 0.005,  # 0.5 %
+                     ):
+        """
+        Bridge from the current network to to_network through a LI.FI route.
+
+        Returns after the source transaction is confirmed, the arrival in to_network is tracked in background
+        by status_tracker.
+        """
+        network = Networks.get_network_by_name(to_network)
+        if not network:
+            raise ValueError(f"Unknown network {to_network}")
+        return await self.swap(from_amount, token_from, token_to, slippage, to_chain_id=network.chain_id)
+
     async def _perform_swap(self, str_amount, from_token_address, to_token_address, chain_id,
-                            slippage, token_from, token_to, from_amount):
+                            slippage, token_from, token_to, from_amount, to_chain_id):
         available_routes, unavailable_routes = await self._get_routes(amount=str_amount,
                                                                       from_token_address=from_token_address,
                                                                       to_token_address=to_token_address,
                                                                       from_chain_id=chain_id,
-                                                                      to_chain_id=chain_id,
+                                                                      to_chain_id=to_chain_id,
                                                                       slippage=slippage)
-        best_output_route = None
-        for index, route in enumerate(available_routes):
-            if any(tag in route["tags"] for tag in ("RECOMMENDED", "CHEAPEST", "FASTEST")):
+        ranked_routes = rank_routes(available_routes)
+        if not ranked_routes:
+            raise Exception(f"No routes found for {token_from} to {token_to}")
+
+        # следующие по рейтингу маршруты уже есть, при ошибке до отправки транзакции повторный запрос не нужен
+        candidates = ranked_routes[:settings.jumper.route_fallbacks + 1]
+        for position, (index, route) in enumerate(candidates, 1):
+            if route.get("tags"):
                 self._logger.success(f"Route with tags {route['tags']} was found")
-                best_output_route = route
-                route_id = best_output_route["id"] + ":" + str(index)
-
-        if best_output_route is None:
-            self._logger.warning(f"No route with tags found for {token_from} to {token_to}, will get default quote")
-            output_comparison_dict = {(float(route["toAmountUSD"]) - float(route["gasCostUSD"])): route
-                                      for route in available_routes}
-            best_output_route = output_comparison_dict[max(output_comparison_dict)]
-            route_id = best_output_route["id"] + ":" + str(0)  # hardcode
+            try:
+                return await self._execute_route(route, route["id"] + ":" + str(index), from_token_address,
+                                                 chain_id, slippage, token_from, from_amount)
+            except (SimulationFailed, ContractLogicError, CustomRequestException) as e:
+                if position == len(candidates):
+                    raise
+                self._logger.warning(f"Route via {route['steps'][0]['tool']} failed: {excname(e)} {str(e)}, "
+                                     f"trying the next route")
 
+    async def _execute_route(self, best_output_route: dict, route_id: str, from_token_address, chain_id,
+                             slippage, token_from, from_amount):
         from_token_decimals = best_output_route["fromToken"]["decimals"]
         from_token_symbol = best_output_route["fromToken"]["symbol"]
         to_token_decimals = best_output_route["toToken"]["decimals"]
@@ -383,7 +464,7 @@ class JumperExchange(BaseEVMTaskClass["JumperExchange"]):
             from_token=best_output_route["fromToken"]["address"],
             route_id=route_id,
             session_id=self.session_id,
-            step_number=1,  # 1 for swaps, custom for bridges
+            step_number=1,  # маршруты без allowSwitchChain - один шаг и для свапов, и для бриджей
             to_amount=int(best_output_route["toAmount"]),
             to_amount_min=int(best_output_route["toAmountMin"]),
             to_amount_usd=float(best_output_route["toAmountUSD"]),
@@ -394,47 +475,74 @@ class JumperExchange(BaseEVMTaskClass["JumperExchange"]):
         )
         # self._logger.debug(transaction_data_dict)
         if not from_token_address == "0x0000000000000000000000000000000000000000":
-            tx_params = await self._swap_with_permit(tool_key, transaction_data_dict, from_token_address,
-                                                     best_output_route, slippage, token_from,
-                                                     from_amount, steps, chain_id, from_token_symbol)
-            if not tx_params:
+            permit_swap = await self._swap_with_permit(tool_key, transaction_data_dict, from_token_address,
+                                                       best_output_route, slippage, token_from,
+                                                       from_amount, steps, chain_id, from_token_symbol)
+            if not permit_swap:
                 return False
+            tx_params, permit_nonce_key = permit_swap
         else:
-            if await self._create_or_finish_transaction(**transaction_data_dict):
-                tx_params = await self._request_swap_data(steps[0])
-            else:
-                return False
+            permit_nonce_key = None
+            await self._report_transaction(transaction_data_dict)
+            tx_params = await self._request_swap_data(steps[0])
 
         # self._logger.debug(f"tx_params {tx_params}")
         if "gasLimit" in tx_params:
             tx_params.pop("gasLimit")
 
-        tx_hash = await self.network_client.transactions.send_tx(tx_params)
-
-        for _ in range(10):
-            await log_sleep(self, 3)
-            tx_data = await self.get_transaction_status(str(chain_id), str(chain_id), tool_key, tx_hash)
-            self._logger.info(f"Checking transaction status: {tx_data["status"]}")
-            if tx_data["status"] == "DONE":
-                break
-        else:
+        try:
+            tx = await self.network_client.transactions.send_tx(tx_params)
+        except Exception:
+            # nonce permit2 мог не использоваться, в следующий раз читаем его из контракта
+            if permit_nonce_key:
+                Permit2NonceTracker.invalidate(permit_nonce_key)
+            raise
+
+        if not tx:
+            if permit_nonce_key:
+                Permit2NonceTracker.invalidate(permit_nonce_key)
             raise Exception("Transaction failed")
+        tx_hash = tx.hex_hash
 
         transaction_data_dict["action"] = "execution_completed"
         transaction_data_dict["tx_status"] = "COMPLETED"
         transaction_data_dict["tx_hash"] = tx_hash
         transaction_data_dict["is_final"] = True
 
-        if await self._create_or_finish_transaction(**transaction_data_dict):
-            to_amount = TokenAmount(transaction_data_dict["to_amount"], to_token_decimals, wei=True)
-            to_amount_usd = transaction_data_dict["to_amount_usd"]
-            self._logger.success(f"Successfully swapped {from_amount} {from_token_symbol}"
-                                 f" to {to_amount} {to_token_symbol} (${to_amount_usd})\n"
-                                 f"LI.FI explorer: {tx_data['lifiExplorerLink']}")
-            return True
-        else:
-            self._logger.error(f"Tx OK, but confirm on Jumper failed")
-            return True
+        async def finish(tx_data: dict, received: TokenAmount | None = None) -> bool:
+            explorer_link = tx_data.get("lifiExplorerLink", LIFI_EXPLORER_TX + tx_hash)
+            if tx_data.get("status") != "DONE":
+                self._logger.error(f"Transfer is not completed, status {tx_data.get('status')}: {explorer_link}")
+                return False
+            return await self._finish_swap(transaction_data_dict, from_amount, from_token_symbol,
+                                           to_token_decimals, to_token_symbol, explorer_link, received)
+
+        if transaction_data_dict["from_chain_id"] == transaction_data_dict["to_chain_id"]:
+            # успешный receipt свапа в одной сети уже финальный, статус LI.FI не нужен
+            received_wei = received_amount(tx.receipt, transaction_data_dict["to_token"],
+                                           self.network_client.w3_account.address)
+            received = TokenAmount(received_wei, to_token_decimals, wei=True) if received_wei else None
+            if await finish({"status": "DONE", "lifiExplorerLink": LIFI_EXPLORER_TX + tx_hash}, received):
+                return received or True
+            return False
+
+        self.status_tracker.track(transaction_data_dict["from_chain_id"], transaction_data_dict["to_chain_id"],
+                                  tool_key, tx_hash, finish)
+        self._logger.info(f"Source transaction confirmed, tracking the transfer in background")
+        return True
+
+    async def _finish_swap(self, transaction_data_dict: dict, from_amount, from_token_symbol: str,
+                           to_token_decimals: int, to_token_symbol: str, explorer_link: str,
+                           received: TokenAmount | None = None) -> bool:
+        await self._report_transaction(transaction_data_dict)
+        to_amount = received or TokenAmount(transaction_data_dict["to_amount"], to_token_decimals, wei=True)
+        to_amount_usd = transaction_data_dict["to_amount_usd"]
+        action = "swapped" if transaction_data_dict["from_chain_id"] == transaction_data_dict["to_chain_id"] \
+            else "bridged"
+        self._logger.success(f"Successfully {action} {from_amount} {from_token_symbol}"
+                             f" to {to_amount} {to_token_symbol} (${to_amount_usd})\n"
+                             f"LI.FI explorer: {explorer_link}")
+        return True
 
     async def _request_swap_data(self, steps: dict):
         headers = self._headers | {
@@ -447,32 +555,43 @@ class JumperExchange(BaseEVMTaskClass["JumperExchange"]):
         # self._logger.debug(f"_request_swap_data: {resp}")
         return resp["transactionRequest"]
 
-    async def _get_chains_data(self):
+    async def _load_catalog(self):
         headers = self._headers | {
             "x-lifi-integrator": "jumper.exchange",
             "x-lifi-sdk": "3.7.0",
+            "x-lifi-widget": "3.21.0",
         }
+        await lifi_catalog.load(self.requests, headers)
 
-        params = {
-            'chainTypes': 'EVM,SVM,UTXO,MVM',
-        }
-        url = "https://api.jumper.exchange/p/lifi/chains"
-        resp = await self.requests.get(url, params=params, additional_headers=headers)
-        return resp
+    async def _get_chains_data(self):
+        await self._load_catalog()
+        return lifi_catalog.chains_data
 
     async def _get_tokens_data(self):
-        headers = self._headers | {
-            "x-lifi-integrator": "jumper.exchange",
-            "x-lifi-sdk": "3.7.0",
-            "x-lifi-widget": "3.21.0",
-        }
+        await self._load_catalog()
+        return lifi_catalog.tokens_data
 
-        params = {
-            'chainTypes': 'EVM,SVM,UTXO,MVM',
-        }
-        url = "https://api.jumper.exchange/p/lifi/tokens"
-        resp = await self.requests.get(url, params=params, additional_headers=headers)
-        return resp
+    async def resolve_token_address(self, token: str, chain_id: int | None = None) -> str:
+        """
+        Resolve a token from a preset to its address in the current network.
+
+        :param str token: "native", the token address or the token symbol as listed on jumper.exchange.
+        :param int | None chain_id: the chain to look the symbol up in, the current network by default.
+        :return str: "native" or the checksum token address.
+        """
+        token = token.strip()
+        if token.lower() == "native" or Web3.is_address(token):
+            return token if token.lower() == "native" else Web3.to_checksum_address(token)
+
+        await self._load_catalog()
+        chain_id = chain_id or self.network_client.network.chain_id
+        token_data = lifi_catalog.token_by_symbol(chain_id, token)
+        if not token_data:
+            raise ValueError(f"Token {token} is not found in chain {chain_id} on jumper.exchange")
+
+        if int(token_data["address"], 16) == 0:
+            return "native"
+        return Web3.to_checksum_address(token_data["address"])
 
     async def _sign_permit(self, permit_data: dict | None) -> str | None:
         if permit_data:
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable
+
+
+class Permit2NonceTracker:
+    """
+    Local Permit2 nonces per (chain id, owner, verifying contract).
+
+    The nonce is read from the chain (nextNonce) only once, then every permit swap reserves the next one locally.
+    If a swap with a reserved nonce doesn't get confirmed (signature or nonce errors, reverted simulation etc.),
+    the key is invalidated and the next swap reads the nonce from the chain again.
+
+    Usage:
+        key = Permit2NonceTracker.key(chain_id, owner, verifying_contract)
+        nonce = await Permit2NonceTracker.reserve(key, lambda: read_next_nonce())
+        ...
+        Permit2NonceTracker.invalidate(key)  # if the swap failed
+    """
+    _nonces: dict[tuple[int, str, str], int] = {}
+    _locks: dict[tuple[int, str, str], asyncio.Lock] = {}
+
+    @staticmethod
+    def key(chain_id: int, owner: str, verifying_contract: str) -> tuple[int, str, str]:
+        return int(chain_id), owner.lower(), verifying_contract.lower()
+
+    @classmethod
+    async def reserve(cls, key: tuple[int, str, str], read_nonce: Callable[[], Awaitable[int]]) -> int:
+        """
+        Get the nonce for the next permit and advance the local nonce.
+
+        :param tuple key: the key from Permit2NonceTracker.key.
+        :param read_nonce: a function returning the coroutine that reads nextNonce from the chain.
+        :return int: the nonce to sign the permit with.
+        """
+        lock = cls._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key not in cls._nonces:
+                cls._nonces[key] = int(await read_nonce())
+            nonce = cls._nonces[key]
+            cls._nonces[key] = nonce + 1
+            return nonce
+
+    @classmethod
+    def invalidate(cls, key: tuple[int, str, str]) -> None:
+        cls._nonces.pop(key, None)
@@ -0,0 +1,103 @@
+import copy
+import math
+import time
+
+from core.init_settings import settings
+
+
+class RouteQuoteCache:
+    """
+    Short-lived cache of LI.FI /advanced/routes responses shared by all accounts.
+
+    Routes are keyed by (from chain, to chain, from token, to token, amount bucket, slippage), where the amount
+    bucket is logarithmic, so amounts within ~route_cache_amount_bucket of each other share an entry.
+    A cached route is rebound to the requesting account and amount before use, and the transaction itself is
+    still requested per account through /advanced/stepTransaction.
+    """
+    _amount_fields = ("fromAmount", "toAmount", "toAmountMin")
+    _usd_fields = ("fromAmountUSD", "toAmountUSD")
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple, tuple[float, int, list[dict], list[dict]]] = {}
+
+    @staticmethod
+    def amount_bucket(amount: int) -> int:
+        if amount <= 0:
+            return 0
+        return int(math.log(amount) / math.log1p(settings.jumper.route_cache_amount_bucket))
+
+    def key(self, from_chain_id: int, to_chain_id: int, from_token_address: str, to_token_address: str,
+            amount: int, slippage: float) -> tuple:
+        return (from_chain_id, to_chain_id, from_token_address.lower(), to_token_address.lower(),
+                self.amount_bucket(amount), slippage)
+
+    def get(self, key: tuple, amount: int, address: str) -> tuple[list[dict], list[dict]] | None:
+        """
+        Get cached routes rebound to the amount and the address.
+
+        :param tuple key: the cache key.
+        :param int amount: the amount to swap in wei.
+        :param str address: the account address.
+        :return tuple[list[dict], list[dict]] | None: available and unavailable routes or None if nothing is cached.
+        """
+        entry = self._entries.get(key)
+        if not entry:
+            return None
+
+        cached_at, cached_amount, available_routes, unavailable_routes = entry
+        if time.monotonic() - cached_at > settings.jumper.route_cache_ttl:
+            self._entries.pop(key, None)
+            return None
+
+        ratio = amount / cached_amount if cached_amount else 1
+        routes = [self._rebind_route(route, amount, ratio, address) for route in available_routes]
+        return routes, copy.deepcopy(unavailable_routes)
+
+    def put(self, key: tuple, amount: int, available_routes: list[dict], unavailable_routes: list[dict]) -> None:
+        if not available_routes:
+            return
+        self._entries[key] = (time.monotonic(), amount, copy.deepcopy(available_routes),
+                              copy.deepcopy(unavailable_routes))
+
+    def invalidate(self, key: tuple) -> None:
+        """Drop the cached routes, e.g. when a route from them failed the simulation."""
+        self._entries.pop(key, None)
+
+    @classmethod
+    def _scale(cls, data: dict, amount: int, ratio: float, exact_from_amount: bool) -> None:
+        for field in cls._amount_fields:
+            if field in data and data[field] is not None:
+                data[field] = str(int(int(data[field]) * ratio))
+        for field in cls._usd_fields:
+            if data.get(field) is not None:
+                data[field] = f"{float(data[field]) * ratio:.2f}"
+        if exact_from_amount and "fromAmount" in data:
+            data["fromAmount"] = str(amount)
+
+    @classmethod
+    def _rebind_step(cls, step: dict, amount: int, ratio: float, address: str, first: bool) -> None:
+        action = step.get("action", {})
+        if "fromAddress" in action:
+            action["fromAddress"] = address
+        if "toAddress" in action:
+            action["toAddress"] = address
+        cls._scale(action, amount, ratio, first)
+        cls._scale(step.get("estimate", {}), amount, ratio, first)
+
+        for index, included_step in enumerate(step.get("includedSteps", [])):
+            cls._rebind_step(included_step, amount, ratio, address, first and index == 0)
+
+    @classmethod
+    def _rebind_route(cls, route: dict, amount: int, ratio: float, address: str) -> dict:
+        route = copy.deepcopy(route)
+        route["fromAddress"] = address
+        route["toAddress"] = address
+        cls._scale(route, amount, ratio, True)
+
+        for index, step in enumerate(route["steps"]):
+            cls._rebind_step(step, amount, ratio, address, index == 0)
+
+        return route
+
+
+route_quote_cache = RouteQuoteCache()
@@ -0,0 +1,46 @@
+import math
+
+from core.init_settings import settings
+
+
+PREFERRED_TAGS = ("RECOMMENDED", "CHEAPEST", "FASTEST")
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def rank_routes(routes: list[dict]) -> list[tuple[int, dict]]:
+    """
+    Rank LI.FI routes from the best to the worst.
+
+    The score of a route is its net USD output (toAmountUSD - gasCostUSD) minus the execution duration penalty
+    (settings.jumper.route_duration_penalty USD per second). Routes using a tool from settings.jumper.tools_blacklist
+    are dropped, routes with equal scores are ordered by LI.FI tags and then by their original order.
+
+    :param list[dict] routes: the available routes from /advanced/routes.
+    :return list[tuple[int, dict]]: pairs of the index of the route in the response and the route.
+    """
+    if not routes:
+        return []
+
+    blacklist = {tool.lower() for tool in settings.jumper.tools_blacklist}
+
+    scored = []
+    for index, route in enumerate(routes):
+        if any(step["tool"].lower() in blacklist for step in route["steps"]):
+            continue
+        duration = sum(_to_float(step.get("estimate", {}).get("executionDuration")) for step in route["steps"])
+        score = (_to_float(route.get("toAmountUSD")) - _to_float(route.get("gasCostUSD"))
+                 - duration * settings.jumper.route_duration_penalty)
+        if not math.isfinite(score):
+            continue
+        tagged = any(tag in route.get("tags", []) for tag in PREFERRED_TAGS)
+        scored.append((score, tagged, index, route))
+
+    # the sort is stable: score, then tags, then the api order
+    scored.sort(key=lambda item: (-item[0], not item[1]))
+    return [(index, route) for _, _, index, route in scored]
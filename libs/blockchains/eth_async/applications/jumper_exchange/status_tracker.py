@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+from core.init_settings import settings
+from libs.requests.exceptions import CustomRequestException, EXTERNAL_REQUEST_EXCEPTIONS
+from utils.utils import excname
+
+if TYPE_CHECKING:
+    from .jumper_client import JumperExchange
+
+
+LIFI_EXPLORER_TX = "https://scan.li.fi/tx/"
+
+
+class StatusTracker:
+    """
+    Background tracking of cross-chain steps through the LI.FI status api.
+
+    A same-chain swap is final as soon as its receipt is successful, so only cross-chain steps are tracked here.
+    The status is polled with exponential backoff and jitter until it is DONE or FAILED, and the caller gets the
+    task to await together with the other transfers of the action.
+    """
+    _final_statuses = ("DONE", "FAILED")
+
+    def __init__(self, jumper: JumperExchange) -> None:
+        self.jumper = jumper
+        self.tasks: list[asyncio.Task] = []
+
+    @staticmethod
+    def _delay(attempt: int) -> float:
+        delay = min(settings.jumper.status_poll_base_delay * 2 ** attempt, settings.jumper.status_poll_max_delay)
+        return delay + random.uniform(0, delay / 2)
+
+    async def wait_final(self, from_chain_id: int, to_chain_id: int, bridge: str, tx_hash: str) -> dict:
+        """
+        Poll the status of the cross-chain step until it is final.
+
+        :return dict: the last status response, with status "PENDING" if the timeout was reached.
+        """
+        started_at = time.monotonic()
+        tx_data = {"status": "PENDING", "lifiExplorerLink": LIFI_EXPLORER_TX + tx_hash}
+        attempt = 0
+        while time.monotonic() - started_at < settings.jumper.status_poll_timeout:
+            await asyncio.sleep(self._delay(attempt))
+            attempt += 1
+            try:
+                tx_data = await self.jumper.get_transaction_status(str(from_chain_id), str(to_chain_id),
+                                                                   bridge, tx_hash)
+            except (CustomRequestException, *EXTERNAL_REQUEST_EXCEPTIONS) as e:
+                self.jumper._logger.warning(f"Failed to get transaction status: {excname(e)} {str(e)}")
+                continue
+
+            status = tx_data.get("status")
+            self.jumper._logger.debug(f"Checking transaction status: {status} {tx_data.get('substatus', '')}")
+            if status in self._final_statuses:
+                return tx_data
+
+        return tx_data
+
+    def track(self, from_chain_id: int, to_chain_id: int, bridge: str, tx_hash: str,
+              on_final: Callable[[dict], Awaitable[bool]]) -> asyncio.Task:
+        """
+        Track the cross-chain step in the background and pass its final status to on_final.
+        """
+        async def _track() -> bool:
+            tx_data = await self.wait_final(from_chain_id, to_chain_id, bridge, tx_hash)
+            return await on_final(tx_data)
+
+        task = asyncio.create_task(_track())
+        self.tasks.append(task)
+        return task
+
+    async def wait_all(self) -> list[bool]:
+        """
+        Wait for all tracked steps, returns the results of on_final (or False if tracking failed).
+        """
+        tasks, self.tasks = self.tasks, []
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                self.jumper._logger.error(f"Cross-chain tracking failed: {excname(result)} {str(result)}")
+        return [result if not isinstance(result, BaseException) else False for result in results]
@@ -1,8 +1,12 @@
 from __future__ import annotations
+import json
 from typing import TYPE_CHECKING
 
 from web3 import Web3
-from eth_typing import ChecksumAddress
+from eth_typing import ChecksumAddress, HexStr
+from eth_utils import function_abi_to_4byte_selector
+from eth_utils.abi import collapse_if_tuple
+from eth_abi.exceptions import EncodingError
 from web3.contract import AsyncContract, Contract
 
 from .data.models import DefaultABIs, RawContract, TransferAddress
@@ -14,8 +18,80 @@ if TYPE_CHECKING:
 
 
 class Contracts:
+    # id(abi) -> (abi, key). The abi itself is kept so its id can't be reused by another object
+    _abi_keys: dict[int, tuple[list, str]] = {}
+    # (abi key, function name) -> (selector, input types) or None if the function is overloaded/missing
+    _function_codecs: dict[tuple[str, str], tuple[bytes, list[str]] | None] = {}
+    # json ABI -> the parsed ABI, so an ABI passed as a string is one object and hits the caches above
+    _parsed_abis: dict[str, list] = {}
+
     def __init__(self, client: NetworkClient) -> None:
         self.client = client
+        self._w3 = None
+        self._factories: dict[str, type[AsyncContract]] = {}
+        self._instances: dict[tuple[str, ChecksumAddress], AsyncContract] = {}
+
+    @classmethod
+    def _abi_key(cls, abi: list) -> str:
+        """
+        Get a stable key of the ABI. ABIs in this project are module-level constants, so the key is computed
+        once per ABI object and then looked up by id.
+
+        :param list abi: the contract ABI.
+        :return str: the ABI key.
+        """
+        cached = cls._abi_keys.get(id(abi))
+        if cached and cached[0] is abi:
+            return cached[1]
+
+        key = Web3.keccak(text=json.dumps(abi, sort_keys=True)).hex()
+        cls._abi_keys[id(abi)] = (abi, key)
+        return key
+
+    @classmethod
+    def _parse_abi(cls, abi: str) -> list:
+        """
+        Parse the json ABI once per string.
+
+        :param str abi: the contract ABI as json.
+        :return list: the parsed ABI, the same object for equal strings.
+        """
+        parsed = cls._parsed_abis.get(abi)
+        if parsed is None:
+            parsed = json.loads(abi)
+            cls._parsed_abis[abi] = parsed
+        return parsed
+
+    def _check_w3(self) -> None:
+        # factories are bound to the AsyncWeb3 instance, which is recreated on RPC or proxy change
+        if self._w3 is not self.client.w3:
+            self._w3 = self.client.w3
+            self._factories.clear()
+            self._instances.clear()
+
+    def _bind(self, contract_address: ChecksumAddress, abi: list) -> AsyncContract:
+        """
+        Get a contract instance from the cached factory of the ABI.
+
+        :param ChecksumAddress contract_address: the checksummed contract address.
+        :param list abi: the contract ABI.
+        :return AsyncContract: the contract instance.
+        """
+        self._check_w3()
+        abi_key = self._abi_key(abi)
+
+        contract = self._instances.get((abi_key, contract_address))
+        if contract:
+            return contract
+
+        factory = self._factories.get(abi_key)
+        if not factory:
+            factory = self.client.w3.eth.contract(abi=abi)
+            self._factories[abi_key] = factory
+
+        contract = factory(address=contract_address)
+        self._instances[(abi_key, contract_address)] = contract
+        return contract
 
     async def default_token(self, contract_address: ChecksumAddress | str) -> Contract | AsyncContract:
         """
@@ -25,7 +101,53 @@ class Contracts:
         :return Contract | AsyncContract: the token contract instance.
         """
         contract_address = Web3.to_checksum_address(contract_address)
-        return self.client.w3.eth.contract(address=contract_address, abi=DefaultABIs.Token)
+        return self._bind(contract_address, DefaultABIs.Token)
+
+    @classmethod
+    def _function_codec(cls, abi: list, function_name: str) -> tuple[bytes, list[str]] | None:
+        """
+        Get the selector and the input types of the function, computed once per ABI.
+
+        :param list abi: the contract ABI.
+        :param str function_name: the function name.
+        :return tuple[bytes, list[str]] | None: the selector and input types or None if the name is ambiguous.
+        """
+        key = (cls._abi_key(abi), function_name)
+        if key not in cls._function_codecs:
+            functions = [
+                element for element in abi
+                if element.get('type') == 'function' and element.get('name') == function_name
+            ]
+            if len(functions) == 1:
+                cls._function_codecs[key] = (
+                    function_abi_to_4byte_selector(functions[0]),
+                    [collapse_if_tuple(input_) for input_ in functions[0].get('inputs', [])]
+                )
+            else:
+                cls._function_codecs[key] = None
+
+        return cls._function_codecs[key]
+
+    def encode_abi(self, contract: AsyncContract, function_name: str, args: list | tuple = ()) -> HexStr:
+        """
+        Encode a function call like AsyncContract.encode_abi, but with the selector and input types precomputed.
+
+        :param AsyncContract contract: the contract instance.
+        :param str function_name: the function name.
+        :param list | tuple args: the function arguments.
+        :return HexStr: the encoded call data.
+        """
+        codec = self._function_codec(contract.abi, function_name)
+        if codec:
+            selector, input_types = codec
+            if len(input_types) == len(args):
+                try:
+                    return HexStr('0x' + (selector + self.client.w3.codec.encode(input_types, args)).hex())
+                except (TypeError, ValueError, EncodingError):
+                    # web3 normalizes some arguments (e.g. non-checksummed addresses) before encoding
+                    pass
+
+        return contract.encode_abi(function_name, args=args)
 
     # async def get_signature(self, hex_signature: str) -> list | None:
     #     """
@@ -115,7 +237,9 @@ class Contracts:
             abi = contract_abi
 
         if abi:
-            return self.client.w3.eth.contract(address=contract_address, abi=abi)
+            if isinstance(abi, str):
+                abi = self._parse_abi(abi)
+            return self._bind(contract_address, abi)
 
         return self.client.w3.eth.contract(address=contract_address)
 
@@ -15,3 +15,6 @@ class AmountExceedsBalanceException(Exception):
 
 class TxFailed(Exception):
     pass
+
+class SimulationFailed(Exception):
+    pass
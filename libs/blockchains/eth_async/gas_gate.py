@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import TYPE_CHECKING
+
+from core.init_settings import settings
+from core.logger import get_logger
+from utils.utils import excname
+
+if TYPE_CHECKING:
+    from .ethclient import NetworkClient
+
+
+class GasGate:
+    """
+    One gas price watcher per chain shared by all accounts.
+
+    Accounts waiting for cheap gas register their network client and await the gate. Only one poller per chain
+    reads the gas price (through the client of any account still waiting), and when gas drops below the
+    threshold all waiting accounts are released with a random delay to spread their transactions.
+
+    Usage:
+        gwei = await GasGate.for_chain("Ethereum").wait_below(7, network_client)
+    """
+    _gates: dict[str, GasGate] = {}
+
+    def __init__(self, chain_name: str) -> None:
+        self.chain_name = chain_name
+        self.current_gwei: float | None = None
+        self.updated_at: float = 0
+        self._thresholds: dict[int, float] = {}
+        self._clients: dict[int, NetworkClient] = {}
+        self._changed = asyncio.Condition()
+        self._read_lock = asyncio.Lock()
+        self._poller: asyncio.Task | None = None
+        self.logger = get_logger(class_name=f"GasGate: {chain_name}")
+
+    @classmethod
+    def for_chain(cls, chain_name: str) -> GasGate:
+        if chain_name not in cls._gates:
+            cls._gates[chain_name] = cls(chain_name)
+        return cls._gates[chain_name]
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.current_gwei is not None and time.monotonic() - self.updated_at < settings.gas.gas_retry_delay
+
+    async def _read_gwei(self) -> float | None:
+        # the client of an account that stopped waiting may already be closed, so take any registered one
+        for client in list(self._clients.values()):
+            try:
+                gas_price = await client.transactions.gas_price()
+                return gas_price.Wei / 10 ** 9
+            except Exception as e:
+                self.logger.warning(f"Failed to get gas price: {excname(e)} {str(e)}")
+        return None
+
+    async def _publish(self, gwei: float) -> None:
+        async with self._changed:
+            self.current_gwei = gwei
+            self.updated_at = time.monotonic()
+            self._changed.notify_all()
+
+    async def _refresh(self) -> None:
+        async with self._read_lock:
+            # accounts arriving together share one reading
+            if self.is_fresh:
+                return
+            gwei = await self._read_gwei()
+            if gwei is not None:
+                await self._publish(gwei)
+
+    async def _poll(self) -> None:
+        while self._clients:
+            gwei = await self._read_gwei()
+            if gwei is not None:
+                await self._publish(gwei)
+                if all(gwei > threshold for threshold in self._thresholds.values()):
+                    self.logger.warning(f"High gas in {self.chain_name}: {gwei} Gwei, "
+                                        f"{len(self._clients)} account(s) waiting")
+
+            await asyncio.sleep(settings.gas.gas_retry_delay)
+
+    def _ensure_poller(self) -> None:
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll())
+
+    async def wait_below(self, maximum_gwei: float, network_client: NetworkClient) -> float:
+        """
+        Wait until the gas price on the chain is not higher than maximum_gwei.
+
+        :param float maximum_gwei: the gas price threshold in Gwei.
+        :param NetworkClient network_client: the client of the waiting account, used to read the gas price.
+        :return float: the gas price in Gwei the account was released at.
+        """
+        if self.is_fresh and self.current_gwei <= maximum_gwei:
+            return self.current_gwei
+
+        key = id(network_client)
+        self._clients[key] = network_client
+        self._thresholds[key] = maximum_gwei
+        try:
+            # the first reading is done right away so accounts don't wait a full delay for it
+            await self._refresh()
+            if self.current_gwei is not None and self.current_gwei <= maximum_gwei:
+                return self.current_gwei
+
+            self._ensure_poller()
+            async with self._changed:
+                await self._changed.wait_for(
+                    lambda: self.current_gwei is not None and self.current_gwei <= maximum_gwei
+                )
+        finally:
+            self._clients.pop(key, None)
+            self._thresholds.pop(key, None)
+
+        # all waiting accounts are released by the same reading, spread them out
+        await asyncio.sleep(random.uniform(0, settings.gas.gas_wake_spread))
+        return self.current_gwei
@@ -10,7 +10,7 @@ from aiohttp.client_exceptions import ClientResponseError # RPC response errors
 from core.logger import get_logger
 from core.init_settings import settings
 from libs.blockchains.eth_async.exceptions import InsufficientFundsException, NonceException, GasException, \
-    AmountExceedsBalanceException, TransactionException
+    AmountExceedsBalanceException, TransactionException, SimulationFailed
 
 if TYPE_CHECKING:
     from libs.blockchains.eth_async.ethclient import NetworkClient
@@ -86,6 +86,10 @@ class NetworkClientAware:
                     await self.client.change_rpc()
                     continue
 
+                except SimulationFailed:
+                    # the transaction itself reverts, retrying the same params won't help
+                    raise
+
                 except Exception as e:
                     if tx_params and self.__debug:
                         self.logger.debug(f"Exception {e.__class__.__name__} occurred with tx_params: {tx_params}")
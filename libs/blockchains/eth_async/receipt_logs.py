@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import Any
+
+from web3 import Web3
+
+
+# keccak topics of the events
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"  # Transfer(address,address,uint256)
+DEPOSIT_TOPIC = "0xe1fffcc4923d04b559f4d29a8bfc6cda04eb5b0d3c460751c2402c5c5cc9109c"  # Deposit(address,uint256)
+WITHDRAWAL_TOPIC = "0x7fcf532c15f0a6db0bd6d0e038bea71d30d808c7d98cb3bf7268a95bf5081b65"  # Withdrawal(address,uint256)
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+def _to_hex(value: Any) -> str:
+    if isinstance(value, str):
+        return value.lower() if value.startswith("0x") else "0x" + value.lower()
+    return "0x" + bytes(value).hex()
+
+
+def _address_from_topic(topic: Any) -> str:
+    return Web3.to_checksum_address("0x" + _to_hex(topic)[-40:])
+
+
+def decode_token_transfers(receipt: dict) -> list[dict]:
+    """
+    Decode ERC-20 Transfer and wrapped native token Deposit/Withdrawal events from the receipt.
+
+    Deposit is returned as a transfer from the zero address to the depositor (mint of the wrapped token)
+    and Withdrawal as a transfer from the withdrawer to the zero address (burn).
+
+    :param dict receipt: the transaction receipt.
+    :return list[dict]: transfers with the keys token, from, to and amount (int, in wei).
+    """
+    transfers = []
+    for log in receipt.get("logs", []):
+        topics = [_to_hex(topic) for topic in log["topics"]]
+        if not topics:
+            continue
+
+        data = _to_hex(log["data"])
+        amount = int(data, 16) if len(data) > 2 else 0
+        token = Web3.to_checksum_address(log["address"])
+
+        # у ERC-721 Transfer 4 топика и нет data, такие пропускаем
+        if topics[0] == TRANSFER_TOPIC and len(topics) == 3:
+            transfers.append({"token": token, "from": _address_from_topic(topics[1]),
+                              "to": _address_from_topic(topics[2]), "amount": amount})
+        elif topics[0] == DEPOSIT_TOPIC and len(topics) == 2:
+            transfers.append({"token": token, "from": ZERO_ADDRESS,
+                              "to": _address_from_topic(topics[1]), "amount": amount})
+        elif topics[0] == WITHDRAWAL_TOPIC and len(topics) == 2:
+            transfers.append({"token": token, "from": _address_from_topic(topics[1]),
+                              "to": ZERO_ADDRESS, "amount": amount})
+
+    return transfers
+
+
+def received_amount(receipt: dict, token: str, owner: str) -> int | None:
+    """
+    Get the amount of the ERC-20 token the owner received in the transaction.
+
+    Native coins don't emit events, so for the zero address None is returned and the balance has to be read.
+
+    :param dict receipt: the transaction receipt.
+    :param str token: the token address.
+    :param str owner: the receiving address.
+    :return int | None: the received amount in wei or None if it can't be read from the logs.
+    """
+    if not receipt or int(token, 16) == 0:
+        return None
+
+    token, owner = token.lower(), owner.lower()
+    return sum(transfer["amount"] for transfer in decode_token_transfers(receipt)
+               if transfer["token"].lower() == token and transfer["to"].lower() == owner)
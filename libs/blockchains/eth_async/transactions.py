@@ -8,14 +8,14 @@ from hexbytes import HexBytes
 from web3 import Web3
 from web3.contract import AsyncContract
 from web3.types import TxReceipt, _Hash32, TxParams, Nonce
-from web3.exceptions import TimeExhausted
+from web3.exceptions import TimeExhausted, ContractLogicError
 from eth_account.datastructures import SignedTransaction, SignedMessage
 from eth_account.messages import encode_defunct, encode_typed_data
 
 from core.init_settings import settings
 from core.logger import get_logger
 from .data import types
-from .exceptions import TransactionException, GasException, NonceException, TxFailed
+from .exceptions import TransactionException, GasException, NonceException, TxFailed, SimulationFailed
 from libs.blockchains.classes import AutoRepr
 from .network_client_aware import NetworkClientAware
 from .data.models import CommonValues, TxArgs, Network, DefaultABIs, RawContract
@@ -64,6 +64,9 @@ class Tx(AutoRepr):
         self.function_identifier = None
         self.input_data = None
 
+    @property
+    def hex_hash(self) -> str:
+        return '0x' + self.hash.hex()
 
     async def parse_params(self, client) -> dict[str, Any]:
         """
@@ -154,6 +157,12 @@ class Transactions(NetworkClientAware):
         else:
             self.logger = get_logger(class_name=f"EthClient: {client.network.name}")
 
+        # при параллельных транзакциях одного кошелька nonce выдаются локально по порядку отправки
+        self.sequence_nonces = False
+        self.nonce_lock = asyncio.Lock()
+        self._local_nonce: int | None = None
+        self._approve_locks: dict[tuple[str, str], asyncio.Lock] = {}
+
     @NetworkClientAware.retry
     async def gas_price(self) -> TokenAmount:
         """
@@ -224,7 +233,8 @@ class Transactions(NetworkClientAware):
     @NetworkClientAware.retry
     async def add_nonce(self, tx_params):
         try:
-            if not tx_params.get('nonce'):
+            # в режиме sequence_nonces nonce ставится в sign_and_send непосредственно перед отправкой
+            if not tx_params.get('nonce') and not self.sequence_nonces:
                 tx_params['nonce'] = await self.client.wallet.nonce()
             return tx_params
         except:
@@ -274,23 +284,48 @@ class Transactions(NetworkClientAware):
             raise GasException(f"Failed to estimate gas: {str(e)}") from e
 
     @NetworkClientAware.retry
-    async def preflight_balance_check(self, tx_params):
-        try:
-            # balance = await self.client.wallet.balance()
-            # if "gasPrice" in tx_params:
-            #     needed_balance = tx_params["gas"] * tx_params["gasPrice"]
-            #     if balance.Wei < needed_balance:
-            #         raise InsufficientFundsException(f"Balance: {balance.Ether} {self.client.network.coin_symbol} "
-            #                                 f"less than {needed_balance * 10**18} {self.client.network.coin_symbol}")
-
-            call_res = await self.client.w3.eth.call(tx_params)
-        except:
-            raise
+    async def simulate(self, tx_params: TxParams) -> TxParams:
+        """
+        Simulate the fully built transaction against the pending block before signing it. eth_call and
+        eth_estimateGas are sent concurrently, the estimate is used as the gas limit if it is missing.
+        They are not sent as one JSON-RPC batch: web3's batch mode switches the whole provider into batching,
+        which would capture other requests of the wallet running at the same time (concurrent swaps).
+
+        Args:
+            tx_params (TxParams): parameters of the transaction.
+
+        Returns:
+            TxParams: parameters of the transaction with added 'gas'.
+
+        Raises:
+            SimulationFailed: the transaction reverts.
+
+        """
+        call_params = {key: value for key, value in tx_params.items() if key != 'chainId'}
+        call_result, gas = await asyncio.gather(
+            self.client.w3.eth.call(call_params, block_identifier='pending'),
+            self.client.w3.eth.estimate_gas(call_params, block_identifier='pending'),
+            return_exceptions=True
+        )
+
+        for result in (call_result, gas):
+            if isinstance(result, ContractLogicError) or (
+                    isinstance(result, Exception) and "execution reverted" in str(result).lower()):
+                raise SimulationFailed(f"Transaction simulation reverted: {result}") from result
+
+            if isinstance(result, Exception):
+                raise result
+
+        if 'gas' not in tx_params or not int(tx_params['gas']):
+            tx_params['gas'] = int(gas * settings.gas.gas_limit_multiplier)
+
+        return tx_params
 
     async def auto_add_params(self, tx_params: TxParams) -> TxParams:
         """
         Add 'chainId', 'nonce', 'from', 'gasPrice' or 'maxFeePerGas' + 'maxPriorityFeePerGas' and 'gas' parameters to
-            transaction parameters if they are missing.
+            transaction parameters if they are missing. If enabled in settings, the transaction is simulated
+            before the gas limit is set.
 
         Args:
             tx_params (TxParams): parameters of the transaction.
@@ -306,7 +341,8 @@ class Transactions(NetworkClientAware):
 
         tx_params = await self.add_nonce(tx_params)
         tx_params = await self.add_gas_price(tx_params)
-        # await self.preflight_balance_check(tx_params)
+        if settings.general.simulate_transactions:
+            tx_params = await self.simulate(tx_params)
         tx_params = await self.add_gas(tx_params)
 
         return tx_params
@@ -340,10 +376,32 @@ class Transactions(NetworkClientAware):
 
         """
         auto_added_params = await self.auto_add_params(tx_params=tx_params)
+        if self.sequence_nonces:
+            return await self._sign_and_send_sequenced(auto_added_params)
+
         signed_tx = await self.sign_transaction(auto_added_params)
         tx_hash = await self.client.w3.eth.send_raw_transaction(transaction=signed_tx.raw_transaction)
         return Tx(tx_hash=tx_hash, params=tx_params) if tx_hash else None
 
+    async def _sign_and_send_sequenced(self, tx_params: TxParams) -> Tx | None:
+        # nonce выдается и транзакция отправляется под одним локом, поэтому nonce уходят в сеть без пропусков
+        async with self.nonce_lock:
+            try:
+                if self._local_nonce is None:
+                    self._local_nonce = await self.client.wallet.nonce(block_identifier="pending")
+                tx_params['nonce'] = Nonce(self._local_nonce)
+                signed_tx = await self.sign_transaction(tx_params)
+                tx_hash = await self.client.w3.eth.send_raw_transaction(transaction=signed_tx.raw_transaction)
+            except Exception:
+                self._local_nonce = None
+                raise
+
+            if not tx_hash:
+                self._local_nonce = None
+                return None
+            self._local_nonce += 1
+            return Tx(tx_hash=tx_hash, params=tx_params)
+
     async def normalize_tx_params(self, tx_params: TxParams | dict):
         if tx_params.get("gasLimit"):
             tx_params['gas'] = tx_params.pop('gasLimit')
@@ -401,13 +459,20 @@ class Transactions(NetworkClientAware):
 
         return tx_params
 
-    async def send_tx(self, tx_params: TxParams | dict) -> str | bool:
+    async def send_tx(self, tx_params: TxParams | dict) -> Tx | bool:
+        """
+        Send the transaction and wait for its receipt.
+
+        Returns:
+            Tx | bool: the sent transaction with the receipt or False if the receipt wasn't received.
+
+        """
         tx_params = await self.normalize_tx_params(tx_params)
         for _ in range(1, settings.general.number_of_retries + 1):
             try:
                 tx = await self.sign_and_send(tx_params)
                 if tx:
-                    explorer_link = f"{self.client.network.explorer}tx/{'0x' + tx.hash.hex()}"
+                    explorer_link = f"{self.client.network.explorer}tx/{tx.hex_hash}"
                     self.logger.info(f"Sent tx, waiting for receipt... ({explorer_link})")
 
                     receipt = await self.wait_for_receipt(tx_hash=tx.hash, timeout=200, poll_latency=1)
@@ -416,7 +481,8 @@ class Transactions(NetworkClientAware):
                     elif receipt:
                         if receipt["status"] == 1:
                             self.logger.success(f"Successful transaction: {explorer_link}\n")
-                            return '0x' + tx.hash.hex()
+                            tx.receipt = receipt
+                            return tx
 
                         elif receipt["status"] == 0:
                             raise TxFailed(f"Transaction failed: {explorer_link}\n")
@@ -521,7 +587,7 @@ class Transactions(NetworkClientAware):
                     to=recipient,
                     value=self.client.w3.to_wei(amount.Wei, unit='wei'),
                 )
-                encoded_data = contract.encode_abi('transfer', args=args.tuple())
+                encoded_data = self.client.contracts.encode_abi(contract, 'transfer', args=args.tuple())
             tx_params = TxParams(
                 to=contract.address,
                 data=encoded_data,
@@ -568,19 +634,17 @@ class Transactions(NetworkClientAware):
         else:
             amount = amount.Wei
 
-        if not nonce:
-            nonce = Nonce(await self.client.wallet.nonce())
-
         tx_args = TxArgs(
             spender=spender,
             amount=amount
         )
 
         tx_params = TxParams(
-            nonce=Nonce(nonce),
             to=contract.address,
-            data=contract.encode_abi('approve', args=tx_args.tuple())
+            data=self.client.contracts.encode_abi(contract, 'approve', args=tx_args.tuple())
         )
+        if nonce:
+            tx_params['nonce'] = Nonce(nonce)
 
         if gas_limit:
             if isinstance(gas_limit, int):
@@ -617,26 +681,30 @@ class Transactions(NetworkClientAware):
         elif not amount and approve_inf:
             amount = TokenAmount(CommonValues.InfinityInt, 18, True)
 
-        approved = await self.client.transactions.approved_amount(
-            token=token,
-            spender=spender,
-            owner=self.client.w3_account.address
-        )
+        token_address = token if isinstance(token, str) else token.address
+        # параллельные свапы одного токена не должны аппрувить одно и то же дважды
+        approve_lock = self._approve_locks.setdefault((token_address.lower(), str(spender).lower()), asyncio.Lock())
+        async with approve_lock:
+            approved = await self.client.transactions.approved_amount(
+                token=token,
+                spender=spender,
+                owner=self.client.w3_account.address
+            )
 
-        if amount.Wei <= approved.Wei:
-            self.logger.success(f"{approved} {token_symbol} already approved for {spender}")
-            return True
+            if amount.Wei <= approved.Wei:
+                self.logger.success(f"{approved} {token_symbol} already approved for {spender}")
+                return True
 
-        tx = await self.client.transactions.approve(
-            token=token,
-            spender=spender,
-            amount=amount
-        )
+            tx = await self.client.transactions.approve(
+                token=token,
+                spender=spender,
+                amount=amount
+            )
 
-        if isinstance(tx, Tx):
-            receipt = await self.wait_for_receipt(tx_hash=tx.hash, timeout=300, poll_latency=0.5)
-        else:
-            return False
+            if isinstance(tx, Tx):
+                receipt = await self.wait_for_receipt(tx_hash=tx.hash, timeout=300, poll_latency=0.5)
+            else:
+                return False
 
         if receipt:
             self.logger.success(f"{amount} {token_symbol} successfully approved for {spender}")
@@ -699,7 +767,7 @@ class Transactions(NetworkClientAware):
         )
         transaction_params = TxParams(
             value=self.client.w3.to_wei(amount.Wei, unit="wei"),
-            data=wrapped_token_contract.encode_abi("deposit"),
+            data=self.client.contracts.encode_abi(wrapped_token_contract, "deposit"),
             to=self.client.network.wrapped_token_address
         )
         return await self.send_tx(transaction_params)
@@ -714,7 +782,7 @@ class Transactions(NetworkClientAware):
         )
         transaction_params = TxParams(
             value=self.client.w3.to_wei(0, unit="wei"),
-            data=wrapped_token_contract.encode_abi("withdraw", [amount.Wei]),
+            data=self.client.contracts.encode_abi(wrapped_token_contract, "withdraw", [amount.Wei]),
             to=self.client.network.wrapped_token_address
         )
         return await self.send_tx(transaction_params)
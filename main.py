@@ -1,4 +1,5 @@
 import asyncio
+import multiprocessing
 import signal
 import sys
 
@@ -137,6 +138,8 @@ async def main():
         # loop.remove_signal_handler(signal.SIGINT)
 
 if __name__ == "__main__":
+    # пул процессов для вычисления адресов при импорте аккаунтов (нужно для собранного exe)
+    multiprocessing.freeze_support()
     try:
         if sys.platform == 'win32':
             asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
@@ -4,8 +4,8 @@ from http.cookiejar import CookieJar
 
 import curl_cffi
 
-from core.db_utils.models import Account
-from core.db_utils.db import db
+from core.db_utils.records import AccountRecord
+from core.db_utils.proxy_pool import proxy_pool
 from core.init_settings import settings
 from core.logger import get_logger
 from libs.blockchains.eth_async.data.models import Network
@@ -16,11 +16,12 @@ from utils.utils import get_caller_function, excname
 
 
 class Controller:
-    def __init__(self, account: Account, log_context):
+    def __init__(self, account: AccountRecord, log_context):
         self.account = account
         self.logger = get_logger(class_name=self.__class__.__name__, **log_context)
         self.log_context = log_context
         self._proxy = account.proxy
+        self._leased_proxy: str | None = None  # прокси, взятый из пула запасных
         self.async_session: BaseAsyncSession | None = None
         self.requests_client: RequestsClient | None = None
         self.eth_client: EthClient | None = None
@@ -71,6 +72,12 @@ class Controller:
             return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._close_sessions()
+        if self._leased_proxy:
+            await proxy_pool.release(self._leased_proxy, self.account.name)
+            self._leased_proxy = None
+
+    async def _close_sessions(self):
         try:
             if self.eth_client:
                 await self.eth_client.close()
@@ -86,14 +93,17 @@ class Controller:
 
         self.logger.info(f"Changing proxy from {self.eth_client.proxy}")
         if not new_proxy:
-            new_proxy = db.get_free_proxy()
+            # текущий прокси из пула сменяется из-за ошибки и уходит на паузу
+            if self._leased_proxy:
+                await proxy_pool.release(self._leased_proxy, self.account.name, failed=True)
+                self._leased_proxy = None
+
+            new_proxy = await proxy_pool.acquire(self.account.name)
             if not new_proxy:
-                db.reset_proxies()
-                new_proxy = db.get_free_proxy()
-                if not new_proxy:
-                    raise Exception("Failed to get new proxy even after reset")
+                raise Exception("Failed to get new proxy, all spare proxies are in use")
+            self._leased_proxy = new_proxy
 
-        await self.__aexit__(None, None, None)
+        await self._close_sessions()
         await self.__aenter__(new_proxy, new=False)
         self.requests_client.async_session = self.async_session
 
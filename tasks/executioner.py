@@ -1,24 +1,58 @@
 import asyncio
-import json
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
 
 import curl_cffi
 from curl_cffi.requests.exceptions import ProxyError, SSLError, Timeout
 from aiohttp.client_exceptions import ClientHttpProxyError, ClientProxyConnectionError
 from web3.exceptions import BadFunctionCallOutput
 
-from core.db_utils.models import Account, RouteAction
+from core.db_utils.records import AccountRecord, RouteActionRecord
 from core.logger import get_logger
 from core.init_settings import settings
+from core.preset_params import PresetParams, SwapSpec, preset_params_cache
 from libs.blockchains.eth_async.applications.jumper_exchange.jumper_client import JumperExchange
+from libs.blockchains.eth_async.data.models import Networks
 from libs.blockchains.eth_async.ethclient import NetworkClient
+from libs.blockchains.eth_async.gas_gate import GasGate
 from libs.blockchains.omnichain_models import TokenAmount
 from libs.blockchains.eth_async.exceptions import InsufficientFundsException
 from utils.utils import randfloat, excname
 from tasks.controller import Controller
 
 
+@dataclass
+class TransfersInFlight:
+    """
+    Result of an action whose cross-chain transfers are still being delivered.
+
+    The controller of the action stays open for the status polling and is closed by wait(), so the account
+    doesn't hold its slot in the flow while the transfers are in flight.
+    """
+    results: dict
+    jumper: JumperExchange
+    exit_stack: AsyncExitStack | None = None
+
+    async def wait(self) -> bool:
+        """
+        Wait for the delivery of all transfers of the action.
+
+        :return bool: True if all transfers were delivered.
+        """
+        try:
+            delivered = await self.jumper.status_tracker.wait_all()
+            self.results["delivered transfers"] = f"{sum(delivered)}/{len(delivered)}"
+            return all(delivered)
+        finally:
+            try:
+                await self.jumper.analytics.drain()
+            finally:
+                if self.exit_stack:
+                    await self.exit_stack.aclose()
+
+
 class Executioner:
-    def __init__(self, account: Account, total_account_num: int, action_num: int, total_actions: int):
+    def __init__(self, account: AccountRecord, total_account_num: int, action_num: int, total_actions: int):
         self.account = account
         self.try_num = 1
         self.action_num = action_num
@@ -50,29 +84,28 @@ class Executioner:
     async def gas_control(self, controller: Controller):
         if settings.gas.gas_control:
             network_client = getattr(controller.eth_client, settings.gas.gas_chain_name)
-            gas_price = await network_client.transactions.gas_price()
-            gwei = gas_price.Wei / 10 ** 9
-            while gwei > settings.gas.maximum_gwei:
-                self.logger.warning(f"High gas in {settings.gas.gas_chain_name}: {gwei} Gwei")
-                await self.sleep(settings.gas.gas_retry_delay)
-                gas_price = await network_client.transactions.gas_price()
-                gwei = gas_price.Wei / 10 ** 9
-            else:
-                self.logger.success(f"Current gas price is good: {gwei} Gwei")
+            gas_gate = GasGate.for_chain(settings.gas.gas_chain_name)
+            if not gas_gate.is_fresh or gas_gate.current_gwei > settings.gas.maximum_gwei:
+                self.logger.info(f"Waiting for gas in {settings.gas.gas_chain_name} "
+                                 f"to be under {settings.gas.maximum_gwei} Gwei")
+            gwei = await gas_gate.wait_below(settings.gas.maximum_gwei, network_client)
+            self.logger.success(f"Current gas price is good: {gwei} Gwei")
 
 
     def get_function(self, func_name: str):
         return self.__getattribute__(func_name)
 
-    async def execute_action(self, action: RouteAction):
-        action_params = json.loads(action.params.action_params) if action.params else {}
+    async def execute_action(self, action: RouteActionRecord):
+        # параметры пресета разбираются и проверяются один раз на ActionParams
+        action_params = preset_params_cache.get(action.params)
 
         action_type = action.action_type.lower()
         project_type = action_type.split("_")[0]
 
         action_function = self.get_function(f"execute_{project_type}_actions")
 
-        async with Controller(self.account, self.log_context) as controller:
+        async with AsyncExitStack() as exit_stack:
+            controller = await exit_stack.enter_async_context(Controller(self.account, self.log_context))
             while self.try_num <= settings.general.number_of_retries:
                 self.log_context["try_num"] = self.try_num
                 self.logger = get_logger(class_name=self.__class__.__name__, **self.log_context)
@@ -84,7 +117,12 @@ class Executioner:
                     if result == "Bridge isn't needed":
                         result = True
 
-                    if result is True:
+                    if isinstance(result, TransfersInFlight):
+                        # контроллер закроется после доставки переводов, в TransfersInFlight.wait
+                        result.exit_stack = exit_stack.pop_all()
+                        self.logger.info(f"Action {action.action_name} is waiting for delivery of "
+                                         f"{len(result.jumper.status_tracker.tasks)} transfer(s): {result.results}")
+                    elif result is True:
                         self.logger.success(f"Completed action {action.action_name}")
                     elif isinstance(result, dict):
                         self.logger.success(f"Completed action {action.action_name}: {result}")
@@ -105,7 +143,7 @@ class Executioner:
                 except BadFunctionCallOutput:
                     self.logger.error(f"{excname(e)} {str(e)}")
                     if "uniswap" in action_type:
-                        self.logger.error(f"Check provided token addresses: {action_params['swap_token_addresses']}, wrong address or token is not in desired Uniswap chain")
+                        self.logger.error(f"Check provided token addresses: {action_params}, wrong address or token is not in desired Uniswap chain")
                         return False
 
                 except Exception as e:
@@ -119,50 +157,142 @@ class Executioner:
             else:
                 return False # this is only if @BaseController.retry is used
 
-    async def execute_jumper_actions(self, action_type: str, action_params: dict, controller: Controller):
+    async def execute_jumper_actions(self, action_type: str, action_params: PresetParams,
+                                     controller: Controller) -> dict | TransfersInFlight:
         action_network = action_type.split("_")[-1]
         jumper = JumperExchange(controller, self.log_context)
         jumper.use_network(action_network)
 
-        swap_params = action_params.get("swap")
-        # bridge_params = action_params.get("bridge")
-
         results = {}
+        in_flight = False
 
         # С этой настройкой true, если в ходе рандома абсолютного числа токена было выбрано количество токена,
         # превышающее баланс кошелька, то будет свапнут весь доступный баланс (если нативка - оставит на газ)
         # Если false, то при недостаточном балансе просто выдаст ошибку и пойдет дальше
         # swap_if_not_sufficient = true
 
-        if "swap" in action_type:
-            chain_swap_params = swap_params.get(action_network)
-            for token_params in chain_swap_params:
-                try:
-                    swap_amount = await self.get_evm_swap_amount(jumper.network_client,
-                                                                 token_params["from_token"], token_params["amount"])
-                    result_string = f"{action_network} from {token_params["from_token"]} to {token_params["to_token"]}"
-                    results[result_string] = await jumper.swap(swap_amount,
-                                             token_params["from_token"],
-                                             token_params["to_token"],
-                                             token_params["slippage"] / 100)
-
-                    if token_params["swap_mode"] == "to_and_from":
-                        if token_params["to_token"] == "native":
-                            raise Exception(f"You are trying to swap back all native into token {token_params['from_token']}")
-
-                        swap_amount = await jumper.network_client.wallet.balance(token_params["to_token"])
-                        result_string = f"{action_network} from {token_params["to_token"]} to {token_params["from_token"]}"
-                        results[result_string] = await jumper.swap(swap_amount,
-                                                                   token_params["to_token"],
-                                                                   token_params["from_token"],
-                                                                   token_params["slippage"] / 100)
-                except InsufficientFundsException as e:
-                    self.logger.error(f"{excname(e)} {str(e)}")
+        try:
+            if "swap" in action_type:
+                chain_swap_params = action_params.specs(action_type)
+                if settings.jumper.concurrent_swaps and len(chain_swap_params) > 1:
+                    await self.execute_jumper_swaps_concurrently(jumper, action_network, chain_swap_params, results)
+                else:
+                    for token_params in chain_swap_params:
+                        await self.execute_jumper_swap(jumper, action_network, token_params, results)
+
+            if "bridge" in action_type:
+                chain_bridge_params = action_params.specs(action_type)
+                for token_params in chain_bridge_params:
+                    try:
+                        to_network = Networks.get_network_by_name(token_params.to_network)
+                        if not to_network:
+                            raise ValueError(f"Unknown network {token_params.to_network}")
+
+                        from_token = await jumper.resolve_token_address(token_params.from_token)
+                        to_token = await jumper.resolve_token_address(token_params.to_token, to_network.chain_id)
+
+                        bridge_amount = await self.get_evm_swap_amount(jumper.network_client,
+                                                                       from_token, token_params.amount)
+                        result_string = (f"{action_network} {token_params.from_token} to "
+                                         f"{token_params.to_network} {token_params.to_token}")
+                        # бриджи не ждут доставки друг друга, она отслеживается в фоне
+                        results[result_string] = await jumper.bridge(bridge_amount,
+                                                                     from_token,
+                                                                     to_token,
+                                                                     token_params.to_network,
+                                                                     token_params.slippage / 100)
+                    except InsufficientFundsException as e:
+                        self.logger.error(f"{excname(e)} {str(e)}")
+
+            # кроссчейн переводы доставляются в фоне, аккаунт продолжит после доставки (AccountManager)
+            if jumper.status_tracker.tasks:
+                in_flight = True
+                return TransfersInFlight(results, jumper)
+        finally:
+            # отчеты Jumper должны уйти до закрытия сессии контроллера
+            if not in_flight:
+                await jumper.analytics.drain()
 
         return results
 
 
-    async def get_evm_swap_amount(self, network_client: NetworkClient, token: str, swap_amounts: list[float | str]):
+    async def execute_jumper_swap(self, jumper: JumperExchange, action_network: str, token_params: SwapSpec,
+                                  results: dict):
+        try:
+            # в пресете токен может быть задан адресом или символом
+            from_token = await jumper.resolve_token_address(token_params.from_token)
+            to_token = await jumper.resolve_token_address(token_params.to_token)
+
+            swap_amount = await self.get_evm_swap_amount(jumper.network_client,
+                                                         from_token, token_params.amount)
+            result_string = f"{action_network} from {token_params.from_token} to {token_params.to_token}"
+            results[result_string] = received = await jumper.swap(swap_amount,
+                                                from_token,
+                                                to_token,
+                                                token_params.slippage / 100)
+
+            if token_params.swap_mode == "to_and_from":
+                if to_token == "native":
+                    raise Exception(f"You are trying to swap back all native into token {token_params.from_token}")
+
+                # полученное количество берется из логов транзакции, баланс читается только если его там нет
+                if isinstance(received, TokenAmount):
+                    swap_amount = received
+                else:
+                    swap_amount = await jumper.network_client.wallet.balance(to_token)
+                result_string = f"{action_network} from {token_params.to_token} to {token_params.from_token}"
+                results[result_string] = await jumper.swap(swap_amount,
+                                                           to_token,
+                                                           from_token,
+                                                           token_params.slippage / 100)
+        except InsufficientFundsException as e:
+            self.logger.error(f"{excname(e)} {str(e)}")
+
+    async def execute_jumper_swaps_concurrently(self, jumper: JumperExchange, action_network: str,
+                                                chain_swap_params: list[SwapSpec], results: dict):
+        """
+        Run swaps of one action concurrently. Swaps sharing a token (from or to) depend on each other's balances,
+        so they stay sequential inside one group, and only independent groups run in parallel.
+        Transactions of the wallet get locally sequenced nonces while the groups run.
+        """
+        tokens = await asyncio.gather(*[
+            asyncio.gather(jumper.resolve_token_address(token_params.from_token),
+                           jumper.resolve_token_address(token_params.to_token))
+            for token_params in chain_swap_params
+        ])
+
+        groups: list[tuple[set[str], list[SwapSpec]]] = []
+        for token_params, (from_token, to_token) in zip(chain_swap_params, tokens):
+            entry_tokens = {from_token.lower(), to_token.lower()}
+            linked = [group for group in groups if group[0] & entry_tokens]
+            merged_tokens, merged_params = set(entry_tokens), []
+            for group in linked:
+                groups.remove(group)
+                merged_tokens |= group[0]
+                merged_params += group[1]
+            groups.append((merged_tokens, merged_params + [token_params]))
+
+        async def run_group(group_params: list[SwapSpec]):
+            for token_params in group_params:
+                await self.execute_jumper_swap(jumper, action_network, token_params, results)
+
+        self.logger.info(f"Running {len(chain_swap_params)} swaps in {len(groups)} concurrent group(s)")
+        transactions = jumper.network_client.transactions
+        transactions.sequence_nonces = True
+        try:
+            group_results = await asyncio.gather(*[run_group(group_params) for _, group_params in groups],
+                                                 return_exceptions=True)
+        finally:
+            transactions.sequence_nonces = False
+            # следующий параллельный запуск (например, повтор действия) читает nonce из сети заново
+            transactions._local_nonce = None
+
+        for result in group_results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def get_evm_swap_amount(self, network_client: NetworkClient, token: str,
+                                  swap_amounts: tuple[float, float] | tuple[str, str]):
         token = token if token.lower() != "native" else None
         decimals = await network_client.transactions.get_decimals(token) if token else 18
         balance = await network_client.wallet.balance(token)